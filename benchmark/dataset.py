@@ -0,0 +1,117 @@
+import random
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy.engine import Connection
+
+from metasking.model import Task, Category, Log, Record, LogFlag
+
+
+FLAGS = ["billable", "meeting", "review", "support", "overtime", "remote"]
+WORDS = [
+    "fix", "implement", "discuss", "plan", "deploy", "review", "test",
+    "api", "database", "client", "release", "bug", "feature", "docs",
+]
+
+# Number of logs generated (and inserted) at once
+BATCH_SIZE = 10000
+
+
+def generate(
+    logs: int,
+    seed: int = 0,
+    open_logs: int = 20,
+    start: datetime = datetime(2020, 1, 1),
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[dict[str, list[dict]]]:
+    """
+    Generate rows of a realistic dataset in batches (rows per table)
+
+    Logs follow each other in time, every log consists of several records
+    (pause/resume churn). The last `open_logs` logs are not stopped and the
+    very last one is running. Tasks and categories come in the first batch.
+    The same seed always gives the same dataset.
+    """
+
+    rng = random.Random(seed)
+    tasks = [
+        {"id": i + 1, "name": f"task-{i + 1}", "description": None}
+        for i in range(max(10, logs // 100))
+    ]
+    categories = [
+        {"id": i + 1, "name": f"category-{i + 1}", "description": None}
+        for i in range(10)
+    ]
+
+    batch: dict[str, list[dict]] = {
+        "task": tasks,
+        "category": categories,
+        "log": [],
+        "record": [],
+        "logflag": [],
+    }
+    record_id = 0
+    time = start
+    for log_id in range(1, logs + 1):
+        row = {
+            "id": log_id,
+            "category_id": (
+                rng.choice(categories)["id"] if rng.random() < 0.8 else None
+            ),
+            "task_id": rng.choice(tasks)["id"] if rng.random() < 0.6 else None,
+            "meta": None,
+            "stopped": log_id <= logs - open_logs,
+            "name": " ".join(rng.choices(WORDS, k=rng.randint(1, 3))),
+            "description": (
+                " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+                if rng.random() < 0.5 else None
+            ),
+        }
+        for flag in rng.sample(FLAGS, k=rng.randint(0, 2)):
+            batch["logflag"].append({"log_id": log_id, "flag": flag})
+        records = []
+        for _ in range(rng.randint(1, 4)):
+            time += timedelta(minutes=rng.randint(1, 30))
+            end = time + timedelta(minutes=rng.randint(5, 120))
+            record_id += 1
+            records.append({
+                "id": record_id,
+                "log_id": log_id,
+                "meta": None,
+                "start": time,
+                "end": end,
+            })
+            time = end
+        time += timedelta(minutes=rng.randint(1, 240))
+        if log_id == logs:
+            # The last log is running
+            records[-1]["end"] = None
+
+        # Stored record summary (see metasking.db.update_log_summaries)
+        finished = [r for r in records if r["end"] is not None]
+        active = len(finished) != len(records)
+        row["start"] = records[0]["start"]
+        row["last_start"] = records[-1]["start"]
+        row["end"] = None if active else records[-1]["end"]
+        row["active"] = active
+        row["total_duration"] = sum(
+            (r["end"] - r["start"]).total_seconds() for r in finished
+        )
+        batch["log"].append(row)
+        batch["record"] += records
+
+        if len(batch["log"]) == batch_size:
+            yield batch
+            batch = {table: [] for table in batch}
+
+    if any(batch.values()):
+        yield batch
+
+
+def populate(connection: Connection, logs: int, seed: int = 0):
+    for batch in generate(logs, seed):
+        for model in [Task, Category, Log, Record, LogFlag]:
+            table = model.__table__  # type: ignore
+            rows = batch[table.name]
+            if rows:
+                connection.execute(table.insert(), rows)
@@ -0,0 +1,203 @@
+"""
+Show EXPLAIN QUERY PLAN of the queries issued by the API endpoints
+with and without the query indexes
+
+    python -m benchmark.explain --logs 10000
+"""
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Any, Optional
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Indexes that existed before the query indexes were introduced,
+# every other index is dropped from the "before" database
+BASELINE_INDEXES = {
+    "ix_category_name",
+    "ix_task_name",
+    "ix_record_start",
+    "ix_record_end",
+}
+
+# Endpoints to capture the queries of (method, path, json body)
+ENDPOINTS: list[tuple[str, str, Optional[dict]]] = [
+    ("GET", "/api/v1/log/list", None),
+    ("GET", "/api/v1/log/list?order=asc", None),
+    ("GET", "/api/v1/log/list?stopped=false", None),
+    ("GET", "/api/v1/log/list?category_id=1", None),
+    ("GET", "/api/v1/log/list?task_id=1", None),
+    ("GET", "/api/v1/log/list?flags=meeting", None),
+    ("GET", "/api/v1/log/search?q=bug+api", None),
+    ("GET", "/api/v1/task/1/logs", None),
+    ("GET", "/api/v1/category/1/logs", None),
+    ("GET", "/api/v1/log/active", None),
+    ("GET", "/api/v1/log/-2", None),
+    ("GET", "/api/v1/log/1", None),
+    ("GET", "/api/v1/record/1/log", None),
+    (
+        "GET",
+        "/api/v1/report/?since=2020-01-01T00:00:00" +
+        "&until=2020-02-01T00:00:00&group_by=category&bucket=week",
+        None,
+    ),
+    ("POST", "/api/v1/log/start", {"name": "benchmark"}),
+    ("POST", "/api/v1/log/active/pause", None),
+    ("POST", "/api/v1/log/-1/resume", None),
+    ("POST", "/api/v1/log/-1/stop", None),
+    ("POST", "/api/v1/log/next", {"name": "benchmark"}),
+    ("POST", "/api/v1/log/all/stop?category_id=1", None),
+]
+
+
+def migrate(database: Path):
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+        check=True,
+        capture_output=True,
+    )
+
+
+def capture_statements() -> list[tuple[str, str, Any]]:
+    """
+    Run the endpoints against the application database and collect
+    the issued statements
+    """
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from metasking import app
+    from metasking.db.db import engine
+
+    engine.sync_engine.echo = False
+
+    current: list[str] = []
+    statements: list[tuple[str, str, Any]] = []
+
+    def on_execute(conn, cursor, statement, parameters, context, many):
+        if many or not statement.lstrip().upper().startswith(
+            ("SELECT", "WITH", "UPDATE", "DELETE")
+        ):
+            return
+        statements.append((current[0], statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    with TestClient(app) as client:
+        for method, path, body in ENDPOINTS:
+            endpoint = f"{method} {path}"
+            current[:] = [endpoint]
+            response = client.request(method, path, json=body)
+            if response.status_code >= 400:
+                print(
+                    f"WARNING: {endpoint} -> {response.status_code}",
+                    file=sys.stderr,
+                )
+    event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+    return statements
+
+
+def drop_query_indexes(database: Path):
+    connection = sqlite3.connect(database)
+    try:
+        names = [
+            name for name, in connection.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'index' AND name LIKE 'ix\\_%' ESCAPE '\\'"
+            )
+        ]
+        for name in names:
+            if name not in BASELINE_INDEXES:
+                connection.execute(f'DROP INDEX "{name}"')
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def explain(database: Path, statement: str, parameters: Any) -> list[str]:
+    connection = sqlite3.connect(database)
+    try:
+        rows = connection.execute(
+            f"EXPLAIN QUERY PLAN {statement}",
+            parameters,
+        ).fetchall()
+    finally:
+        connection.close()
+
+    # Render the plan tree (id, parent, notused, detail)
+    depth: dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logs", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json",
+        type=Path,
+        default=None,
+        help="write the report as JSON to the given file",
+    )
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="metasking-explain-"))
+    before = workdir / "before.db"
+    after = workdir / "after.db"
+    scratch = workdir / "scratch.db"
+
+    # The application engine is created on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch}"
+
+    from sqlalchemy import create_engine
+    from benchmark.dataset import populate
+
+    try:
+        migrate(after)
+        with create_engine(f"sqlite:///{after}").begin() as connection:
+            populate(connection, args.logs, args.seed)
+        shutil.copy(after, before)
+        drop_query_indexes(before)
+        shutil.copy(after, scratch)
+
+        report = []
+        for endpoint, statement, parameters in capture_statements():
+            plan_before = explain(before, statement, parameters)
+            plan_after = explain(after, statement, parameters)
+            report.append({
+                "endpoint": endpoint,
+                "statement": statement,
+                "before": plan_before,
+                "after": plan_after,
+            })
+            print(f"== {endpoint}")
+            print("   " + " ".join(statement.split())[:150])
+            print("   before:")
+            for line in plan_before:
+                print("     " + line)
+            print("   after:")
+            for line in plan_after:
+                print("     " + line)
+            print()
+
+        if args.json is not None:
+            args.json.write_text(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,720 @@
+"""
+Run every v1 endpoint against a generated SQLite dataset through an
+in-process ASGI client and report latency percentiles, number of SQL
+statements and peak RSS per endpoint
+
+    python -m benchmark.run --logs 10000 --json report.json
+
+Requires httpx. Generating large datasets takes a while, pass --database
+to keep the generated database and reuse it in the next runs.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import asyncio
+import sqlite3
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+API = "/api/v1"
+
+# Time window of the first month of the generated data
+# (see benchmark.dataset.generate)
+SINCE = "2020-01-01T00:00:00"
+UNTIL = "2020-02-01T00:00:00"
+
+# Request of a scenario - url and keyword arguments of client.request
+Request = tuple[str, dict[str, Any]]
+
+
+class Scenario(NamedTuple):
+    method: str
+    # Route of the endpoint (report key)
+    route: str
+    # Prepares the state (not measured) and returns the measured request
+    prepare: Callable[[Any, int], Awaitable[Request]]
+    # Upper bound of iterations for expensive endpoints
+    iterations: Optional[int] = None
+
+
+SCENARIOS: list[Scenario] = []
+
+
+def scenario(method: str, route: str, iterations: Optional[int] = None):
+    def register(prepare: Callable[[Any, int], Awaitable[Request]]):
+        SCENARIOS.append(Scenario(method, route, prepare, iterations))
+        return prepare
+    return register
+
+
+async def call(client, method: str, url: str, **kwargs) -> Any:
+    """
+    Request made while preparing a scenario, must succeed
+    """
+
+    response = await client.request(method, API + url, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f"{method} {url} -> {response.status_code}: {response.text}"
+        )
+    return response.json()
+
+
+def new_log(i: int, hours: int = 1) -> dict:
+    # Finished log in the future of the generated data
+    start = datetime(2100, 1, 1) + timedelta(days=i)
+    return {
+        "name": f"benchmark {i}",
+        "description": "benchmark log",
+        "records": [
+            {
+                "start": (start + timedelta(hours=2 * h)).isoformat(),
+                "end": (start + timedelta(hours=2 * h + 1)).isoformat(),
+            }
+            for h in range(hours)
+        ],
+    }
+
+
+# Reads
+
+@scenario("GET", "/log/list")
+async def log_list(client, i):
+    return "/log/list", {}
+
+
+@scenario("GET", "/log/list?limit=1000")
+async def log_list_page(client, i):
+    return "/log/list?limit=1000", {}
+
+
+@scenario("GET", "/log/list?limit=1000 (columnar)")
+async def log_list_page_columnar(client, i):
+    return "/log/list?limit=1000", {
+        "headers": {"Accept": "application/vnd.metasking.columnar+json"},
+    }
+
+
+@scenario("GET", "/log/list?limit=1000 (msgpack)")
+async def log_list_page_msgpack(client, i):
+    return "/log/list?limit=1000", {
+        "headers": {"Accept": "application/msgpack"},
+    }
+
+
+@scenario("GET", "/log/list?order=asc")
+async def log_list_asc(client, i):
+    return "/log/list?order=asc", {}
+
+
+@scenario("GET", "/log/list?stopped=false")
+async def log_list_not_stopped(client, i):
+    return "/log/list?stopped=false", {}
+
+
+@scenario("GET", "/log/list?category_id=1&flags=meeting")
+async def log_list_filtered(client, i):
+    return "/log/list?category_id=1&flags=meeting", {}
+
+
+@scenario("GET", "/log/list?description=bug")
+async def log_list_description(client, i):
+    return "/log/list?description=bug", {}
+
+
+@scenario("GET", "/log/list?cursor=")
+async def log_list_cursor(client, i):
+    # Second page of the cursor pagination
+    response = await client.get(API + "/log/list")
+    cursor = response.headers["X-Next-Cursor"]
+    return f"/log/list?cursor={cursor}", {}
+
+
+@scenario("GET", "/log/export?since=&until=", iterations=20)
+async def log_export(client, i):
+    return f"/log/export?since={SINCE}&until={UNTIL}", {}
+
+
+@scenario("GET", "/log/search")
+async def log_search(client, i):
+    return "/log/search?q=release+client", {}
+
+
+@scenario("GET", "/log/active")
+async def log_active(client, i):
+    return "/log/active", {}
+
+
+@scenario("GET", "/log/{dynamic_log_id}")
+async def log_get(client, i):
+    return "/log/1", {}
+
+
+@scenario("GET", "/log/{dynamic_log_id} (negative)")
+async def log_get_dynamic(client, i):
+    return "/log/-2", {}
+
+
+@scenario("GET", "/log/batch")
+async def log_batch(client, i):
+    ids = "&".join(f"ids={log_id}" for log_id in [*range(1, 46), -1, -2])
+    return f"/log/batch?{ids}", {}
+
+
+@scenario("GET", "/record/batch")
+async def record_batch(client, i):
+    ids = "&".join(f"ids={record_id}" for record_id in range(1, 51))
+    return f"/record/batch?{ids}", {}
+
+
+@scenario("GET", "/record/timeline")
+async def record_timeline(client, i):
+    return f"/record/timeline?since={SINCE}&until={UNTIL}", {}
+
+
+@scenario("GET", "/record/timeline (msgpack)")
+async def record_timeline_msgpack(client, i):
+    return f"/record/timeline?since={SINCE}&until={UNTIL}", {
+        "headers": {"Accept": "application/msgpack"},
+    }
+
+
+@scenario("GET", "/record/{record_id}")
+async def record_get(client, i):
+    return "/record/1", {}
+
+
+@scenario("GET", "/record/{record_id}/log")
+async def record_get_log(client, i):
+    return "/record/1/log", {}
+
+
+@scenario("GET", "/task/list")
+async def task_list(client, i):
+    return "/task/list", {}
+
+
+@scenario("GET", "/task/{task_id}")
+async def task_get(client, i):
+    return "/task/1", {}
+
+
+@scenario("GET", "/task/{task_id}/logs")
+async def task_logs(client, i):
+    return "/task/1/logs", {}
+
+
+@scenario("GET", "/category/list")
+async def category_list(client, i):
+    return "/category/list", {}
+
+
+@scenario("GET", "/category/{category_id}")
+async def category_get(client, i):
+    return "/category/1", {}
+
+
+@scenario("GET", "/category/{category_id}/logs")
+async def category_logs(client, i):
+    return "/category/1/logs", {}
+
+
+@scenario("GET", "/report/")
+async def report(client, i):
+    return (
+        f"/report/?since={SINCE}&until={UNTIL}" +
+        "&group_by=category&bucket=week"
+    ), {}
+
+
+# State transitions
+
+@scenario("POST", "/log/start")
+async def log_start(client, i):
+    return "/log/start", {"json": {"name": f"benchmark {i}"}}
+
+
+@scenario("POST", "/log/next")
+async def log_next(client, i):
+    return "/log/next", {"json": {"name": f"benchmark {i}"}}
+
+
+@scenario("POST", "/log/active/pause")
+async def log_active_pause(client, i):
+    await call(client, "POST", "/log/start", json={"name": "benchmark"})
+    return "/log/active/pause", {}
+
+
+@scenario("POST", "/log/{log_id}/pause")
+async def log_pause(client, i):
+    log = await call(client, "POST", "/log/start", json={"name": "benchmark"})
+    return f"/log/{log['id']}/pause", {}
+
+
+@scenario("POST", "/log/{dynamic_log_id}/resume")
+async def log_resume(client, i):
+    log = await call(client, "POST", "/log/start", json={"name": "benchmark"})
+    await call(client, "POST", "/log/active/pause")
+    return f"/log/{log['id']}/resume", {}
+
+
+@scenario("POST", "/log/active/stop")
+async def log_active_stop(client, i):
+    await call(client, "POST", "/log/start", json={"name": "benchmark"})
+    return "/log/active/stop", {}
+
+
+@scenario("POST", "/log/{dynamic_log_id}/stop")
+async def log_stop(client, i):
+    log = await call(client, "POST", "/log/start", json={"name": "benchmark"})
+    return f"/log/{log['id']}/stop", {}
+
+
+@scenario("POST", "/log/all/stop")
+async def log_all_stop(client, i):
+    for _ in range(3):
+        await call(client, "POST", "/log/start", json={"name": "benchmark"})
+        await call(client, "POST", "/log/active/pause")
+    return "/log/all/stop", {}
+
+
+# Log and record CRUD
+
+@scenario("POST", "/log/all/stop (100 paused logs)", iterations=10)
+async def log_all_stop_many(client, i):
+    for j in range(100):
+        await call(client, "POST", "/log/", json=new_log(100 * i + j))
+    return "/log/all/stop", {}
+
+
+@scenario("POST", "/log/")
+async def log_create(client, i):
+    return "/log/", {"json": new_log(i, hours=3)}
+
+
+@scenario("PUT", "/log/active")
+async def log_update_active(client, i):
+    await call(client, "POST", "/log/start", json={"name": "benchmark"})
+    return "/log/active", {"json": {"description": f"updated {i}"}}
+
+
+@scenario("PUT", "/log/{dynamic_log_id}")
+async def log_update(client, i):
+    return "/log/1", {"json": {"description": f"updated {i}"}}
+
+
+@scenario("DELETE", "/log/{dynamic_log_id}")
+async def log_delete(client, i):
+    log = await call(client, "POST", "/log/", json=new_log(i, hours=3))
+    return f"/log/{log['id']}", {}
+
+
+@scenario("POST", "/log/{dynamic_log_id}/split")
+async def log_split(client, i):
+    log = await call(client, "POST", "/log/", json=new_log(i, hours=4))
+    at = log["records"][2]["start"]
+    return f"/log/{log['id']}/split?at={at}", {}
+
+
+@scenario("POST", "/log/{log_id}/merge/{with_log_id}")
+async def log_merge(client, i):
+    log = await call(client, "POST", "/log/", json=new_log(2 * i, hours=2))
+    log2 = await call(client, "POST", "/log/", json=new_log(2 * i + 1))
+    return f"/log/{log['id']}/merge/{log2['id']}", {}
+
+
+@scenario("POST", "/log/{log_id}/merge (100 logs)", iterations=10)
+async def log_merge_many(client, i):
+    log = await call(client, "POST", "/log/", json=new_log(101 * i))
+    ids = [
+        (await call(client, "POST", "/log/", json=new_log(101 * i + j)))["id"]
+        for j in range(1, 101)
+    ]
+    return f"/log/{log['id']}/merge", {"params": {"ids": ids}}
+
+
+@scenario("POST", "/log/split (100 logs)", iterations=10)
+async def log_split_many(client, i):
+    # Logs crossing two midnights in the future of the generated data
+    day = datetime(2200, 1, 1) + timedelta(days=10 * i)
+    for j in range(100):
+        start = day + timedelta(hours=20, minutes=j)
+        await call(client, "POST", "/log/", json={
+            "name": f"benchmark split {j}",
+            "records": [
+                {
+                    "start": start.isoformat(),
+                    "end": (start + timedelta(hours=8)).isoformat(),
+                },
+                {
+                    "start": (start + timedelta(days=1)).isoformat(),
+                    "end": (start + timedelta(days=1, hours=1)).isoformat(),
+                },
+            ],
+        })
+    since = day.isoformat()
+    until = (day + timedelta(days=3)).isoformat()
+    return f"/log/split?since={since}&until={until}&by=day", {}
+
+
+@scenario("POST", "/log/import", iterations=20)
+async def log_import(client, i):
+    return "/log/import?create-task=true", {
+        "json": [
+            {**new_log(100 * i + j, hours=2), "task": f"imported {j % 10}"}
+            for j in range(100)
+        ],
+    }
+
+
+@scenario("POST", "/log/import/ndjson", iterations=20)
+async def log_import_ndjson(client, i):
+    lines = [
+        json.dumps({**new_log(100 * i + j, hours=2), "task": "imported"})
+        for j in range(100)
+    ]
+    return "/log/import/ndjson?create-task=true", {
+        "content": "\n".join(lines),
+        "headers": {"content-type": "application/x-ndjson"},
+    }
+
+
+@scenario("POST", "/record/")
+async def record_create(client, i):
+    start = datetime(2200, 1, 1) + timedelta(hours=i)
+    return "/record/", {"json": {
+        "log_id": 1,
+        "start": start.isoformat(),
+        "end": (start + timedelta(minutes=30)).isoformat(),
+    }}
+
+
+@scenario("PUT", "/record/{record_id}")
+async def record_update(client, i):
+    return "/record/1", {"json": {"meta": {"benchmark": i}}}
+
+
+@scenario("DELETE", "/record/{record_id}")
+async def record_delete(client, i):
+    log = await call(client, "POST", "/log/", json=new_log(i, hours=2))
+    return f"/record/{log['records'][0]['id']}", {}
+
+
+# Task and category CRUD
+
+@scenario("POST", "/task/")
+async def task_create(client, i):
+    return "/task/", {"json": {"name": f"benchmark task {i}"}}
+
+
+@scenario("PUT", "/task/{task_id}")
+async def task_update(client, i):
+    return "/task/1", {"json": {"description": f"updated {i}"}}
+
+
+@scenario("DELETE", "/task/{task_id}")
+async def task_delete(client, i):
+    task = await call(
+        client, "POST", "/task/", json={"name": f"deleted task {i}"}
+    )
+    return f"/task/{task['id']}", {}
+
+
+@scenario("POST", "/category/")
+async def category_create(client, i):
+    return "/category/", {"json": {"name": f"benchmark category {i}"}}
+
+
+@scenario("PUT", "/category/{category_id}")
+async def category_update(client, i):
+    return "/category/1", {"json": {"description": f"updated {i}"}}
+
+
+@scenario("DELETE", "/category/{category_id}")
+async def category_delete(client, i):
+    category = await call(
+        client, "POST", "/category/", json={"name": f"deleted category {i}"}
+    )
+    return f"/category/{category['id']}", {}
+
+
+class RssSampler:
+    """
+    Peak resident set size while the sampler runs, sampled in
+    a background thread (Linux), otherwise the process high-water mark
+    """
+
+    INTERVAL = 0.001
+
+    def __init__(self):
+        self.peak = 0
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+    @staticmethod
+    def max_rss() -> int:
+        # Kilobytes on Linux, bytes on macOS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+    def current(self) -> Optional[int]:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * self.page_size
+        except OSError:
+            return None
+
+    def sample(self):
+        while self.running:
+            rss = self.current()
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+            time.sleep(self.INTERVAL)
+
+    def __enter__(self) -> "RssSampler":
+        rss = self.current()
+        self.peak = rss if rss is not None else 0
+        if rss is not None:
+            self.running = True
+            self.thread = threading.Thread(target=self.sample, daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        else:
+            self.peak = self.max_rss()
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[
+        percent - 1
+    ]
+
+
+async def run_scenarios(
+    iterations: int,
+    warmup: int,
+    only: Optional[str],
+) -> list[dict]:
+    import httpx
+    from sqlalchemy import event
+
+    from metasking import app
+    from metasking.db.db import engine
+
+    statements = [0]
+
+    def count_statement(conn, cursor, statement, parameters, context, many):
+        statements[0] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    transport = httpx.ASGITransport(app=app)  # type: ignore
+    results = []
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://benchmark",
+    ) as client:
+        for current in SCENARIOS:
+            endpoint = f"{current.method} {API}{current.route}"
+            if only is not None and only not in endpoint:
+                continue
+            count = iterations
+            if current.iterations is not None:
+                count = min(count, current.iterations)
+
+            latencies: list[float] = []
+            queries: list[int] = []
+            status: dict[str, int] = {}
+            gc.collect()
+            with RssSampler() as rss:
+                for i in range(warmup + count):
+                    url, kwargs = await current.prepare(client, i)
+                    statements[0] = 0
+                    start = time.perf_counter()
+                    response = await client.request(
+                        current.method,
+                        API + url,
+                        **kwargs,
+                    )
+                    elapsed = time.perf_counter() - start
+                    if i < warmup:
+                        continue
+                    latencies.append(elapsed * 1000)
+                    queries.append(statements[0])
+                    code = str(response.status_code)
+                    status[code] = status.get(code, 0) + 1
+
+            results.append({
+                "endpoint": endpoint,
+                "requests": count,
+                "status": status,
+                "latency_ms": {
+                    "p50": round(percentile(latencies, 50), 3),
+                    "p95": round(percentile(latencies, 95), 3),
+                    "p99": round(percentile(latencies, 99), 3),
+                    "mean": round(statistics.mean(latencies), 3),
+                    "max": round(max(latencies), 3),
+                },
+                "queries": {
+                    "mean": round(statistics.mean(queries), 2),
+                    "max": max(queries),
+                },
+                "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+            })
+            print_result(results[-1])
+
+    event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+    return results
+
+
+def print_result(result: dict):
+    latency = result["latency_ms"]
+    errors = sum(
+        count for code, count in result["status"].items()
+        if int(code) >= 400
+    )
+    print(
+        f"{result['endpoint'][:60]:60} " +
+        f"p50 {latency['p50']:8.2f} " +
+        f"p95 {latency['p95']:8.2f} " +
+        f"p99 {latency['p99']:8.2f} ms  " +
+        f"queries {result['queries']['mean']:6.2f}  " +
+        f"rss {result['peak_rss_mb']:7.1f} MB" +
+        (f"  ERRORS {errors}" if errors else ""),
+        flush=True,
+    )
+
+
+def create_database(database: Path, logs: int, seed: int):
+    import subprocess
+    from sqlalchemy import create_engine
+
+    from benchmark.dataset import populate
+
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+        check=True,
+        capture_output=True,
+    )
+    engine = create_engine(f"sqlite:///{database}")
+    with engine.begin() as connection:
+        populate(connection, logs, seed)
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--logs", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=50,
+        help="measured requests per endpoint",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=3,
+        help="requests per endpoint made before measuring",
+    )
+    parser.add_argument(
+        "--only",
+        default=None,
+        help="run only endpoints containing the given text",
+    )
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=None,
+        help="generated dataset to reuse (created if it does not exist), " +
+        "the benchmark runs on a copy",
+    )
+    parser.add_argument(
+        "--json",
+        type=Path,
+        default=None,
+        help="write the report as JSON to the given file",
+    )
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="metasking-benchmark-"))
+    database = workdir / "benchmark.db"
+
+    # The application engine is created on import
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["READ_ONLY"] = "false"
+
+    try:
+        started = time.perf_counter()
+        if args.database is None:
+            create_database(database, args.logs, args.seed)
+        else:
+            if not args.database.exists():
+                create_database(args.database, args.logs, args.seed)
+            shutil.copy(args.database, database)
+        print(
+            f"dataset ready in {time.perf_counter() - started:.1f} s",
+            flush=True,
+        )
+
+        connection = sqlite3.connect(database)
+        try:
+            logs, = connection.execute("SELECT COUNT(*) FROM log").fetchone()
+        finally:
+            connection.close()
+
+        results = asyncio.run(
+            run_scenarios(args.iterations, args.warmup, args.only)
+        )
+
+        if args.json is not None:
+            import sqlalchemy
+
+            args.json.write_text(json.dumps({
+                "dataset": {
+                    "logs": logs,
+                    "seed": args.seed,
+                    "database": str(args.database or ""),
+                },
+                "iterations": args.iterations,
+                "warmup": args.warmup,
+                "environment": {
+                    "python": platform.python_version(),
+                    "sqlite": sqlite3.sqlite_version,
+                    "sqlalchemy": sqlalchemy.__version__,
+                    "platform": platform.platform(),
+                },
+                "endpoints": results,
+            }, indent=2))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
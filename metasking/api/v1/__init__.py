@@ -4,11 +4,17 @@ from .log import api as api_log
 from .record import api as api_record
 from .task import api as api_task
 from .category import api as api_category
+from .report import api as api_report
+from .admin import api as api_admin
+from .event import api as api_event
 
 api_router = APIRouter()
 api_router.include_router(api_log)
 api_router.include_router(api_record)
 api_router.include_router(api_task)
 api_router.include_router(api_category)
+api_router.include_router(api_report)
+api_router.include_router(api_admin)
+api_router.include_router(api_event)
 
 __all__ = ["api_router"]
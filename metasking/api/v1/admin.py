@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query
+
+from metasking.db import slow_query_log
+from metasking.model import SlowQuery
+
+
+api = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@api.get("/slow-queries", response_model=list[SlowQuery])
+async def get_slow_queries(
+    *,
+    limit: int = Query(100, lte=1000),
+):
+    """
+    Most recent statements exceeding the slow query threshold
+    (newest first), kept in memory of this process only
+    """
+
+    return list(reversed(slow_query_log.queries))[:limit]
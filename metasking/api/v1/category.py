@@ -1,32 +1,49 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import Depends, APIRouter, HTTPException, Query, Body
-from sqlmodel import Session, select
+from fastapi import (
+    Depends,
+    APIRouter,
+    HTTPException,
+    Query,
+    Body,
+    Request,
+    Response,
+)
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from metasking.db import use_session
+from metasking.db import use_session, data_version
 from metasking.model import (
     LogRead,
     Category, CategoryCreate, CategoryRead, CategoryUpdate,
 )
-from metasking.util import check_read_only
+from metasking.serialize import log_reads_response
+from metasking.util import check_read_only, not_modified
 
-from .log import get_logs
+from .log import query_logs
 
 api = APIRouter(prefix="/category", tags=["category"])
 
 
 @api.get("/list", response_model=list[CategoryRead])
-def get_categories(
+async def get_categories(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
+    request: Request,
+    response: Response,
     offset: int = 0,
     limit: int = Query(100, lte=1000),
 ):
+    etag = data_version.etag()
+    if cached := not_modified(request, etag):
+        return cached
+    response.headers["ETag"] = etag
+
     selector = select(Category) \
         .offset(offset) \
         .limit(limit)
-    result = session.exec(selector)
+    result = await session.exec(selector)
     categories = result.all()
     return categories
 
@@ -38,16 +55,16 @@ def get_categories(
         403: {"description": "Read only mode"},
     },
 )
-def create_category(
+async def create_category(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     category: CategoryCreate = Body(),
 ):
     check_read_only()
     db_category = Category.from_orm(category)
     session.add(db_category)
-    session.commit()
-    session.refresh(db_category)
+    await session.commit()
+    await session.refresh(db_category)
     return db_category
 
 
@@ -58,12 +75,12 @@ def create_category(
         404: {"description": "Category not found"},
     },
 )
-def read_category(
+async def read_category(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     category_id: int,
 ):
-    category = session.get(Category, category_id)
+    category = await session.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
@@ -77,22 +94,22 @@ def read_category(
         404: {"description": "Category not found"},
     },
 )
-def update_category(
+async def update_category(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     category_id: int,
     category: CategoryUpdate = Body(),
 ):
     check_read_only()
-    db_category = session.get(Category, category_id)
+    db_category = await session.get(Category, category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
     category_data = category.dict(exclude_unset=True)
     for key, value in category_data.items():
         setattr(db_category, key, value)
     session.add(db_category)
-    session.commit()
-    session.refresh(db_category)
+    await session.commit()
+    await session.refresh(db_category)
     return db_category
 
 
@@ -104,17 +121,17 @@ def update_category(
         404: {"description": "Category not found"},
     },
 )
-def delete_category(
+async def delete_category(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     category_id: int,
 ):
     check_read_only()
-    db_category = session.get(Category, category_id)
+    db_category = await session.get(Category, category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
-    session.delete(db_category)
-    session.commit()
+    await session.delete(db_category)
+    await session.commit()
     return db_category
 
 
@@ -123,26 +140,38 @@ def delete_category(
     response_model=list[LogRead],
     responses={
         404: {"description": "Category not found"},
+        400: {"description": "Invalid cursor"},
     },
 )
-def get_category_logs(
+async def get_category_logs(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
+    response: Response,
     category_id: int,
     offset: int = 0,
     limit: int = Query(100, lte=1000),
+    cursor: Optional[str] = None,
     stopped: Optional[bool] = None,
     order: str = Query("desc", regex="^(asc|desc)$"),
     since: Optional[datetime] = None,
     until: Optional[datetime] = None,
 ):
-    return get_logs(
+    db_logs = await query_logs(
         session=session,
+        response=response,
         offset=offset,
         limit=limit,
+        cursor=cursor,
         category_id=category_id,
+        task_id=None,
+        category=None,
+        task=None,
+        description=None,
         stopped=stopped,
+        flags=None,
         order=order,
         since=since,
         until=until,
+        load_relationships=False,
     )
+    return log_reads_response(db_logs, headers=response.headers)
@@ -0,0 +1,84 @@
+from typing import AsyncIterator, Optional
+
+import orjson
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from metasking.db import event_broker
+from metasking.model import LogEvent
+
+
+api = APIRouter(prefix="/event", tags=["event"])
+
+# Seconds between keepalive comments of an idle stream
+KEEPALIVE_INTERVAL = 15.0
+
+
+def matches(
+    log_event: LogEvent,
+    log_id: Optional[int],
+    task_id: Optional[int],
+    category_id: Optional[int],
+) -> bool:
+    if log_event.type == "reset":
+        return True
+    if log_id is not None and \
+            log_id not in (log_event.log_id, log_event.related_log_id):
+        return False
+    if task_id is not None and log_event.task_id != task_id:
+        return False
+    if category_id is not None and log_event.category_id != category_id:
+        return False
+    return True
+
+
+@api.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Server-sent events, data of every event " +
+            "is a LogEvent",
+            "content": {"text/event-stream": {}},
+        },
+    },
+)
+async def stream_events(
+    *,
+    log_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    last_event_id: Optional[str] = Query(None, alias="last-event-id"),
+    last_event_id_header: Optional[str] = Header(
+        None,
+        alias="Last-Event-ID",
+    ),
+):
+    """
+    Live stream of log changes (start, next, pause, resume, stop, split,
+    merge, update, delete...) optionally filtered by log/task/category
+
+    A reconnecting client receives the events it missed (Last-Event-ID
+    header or last-event-id parameter), a reset event means that some
+    of them are not available anymore and the state has to be reloaded
+    """
+
+    async def generate_events() -> AsyncIterator[bytes]:
+        # Tell the client how long to wait before reconnecting
+        yield b"retry: 3000\n\n"
+        async for log_event in event_broker.subscribe(
+            last_event_id or last_event_id_header,
+            KEEPALIVE_INTERVAL,
+        ):
+            if log_event is None:
+                yield b": keepalive\n\n"
+            elif matches(log_event, log_id, task_id, category_id):
+                stream_id = event_broker.stream_id(log_event.id)
+                yield b"id: " + stream_id.encode() + b"\n" + \
+                    b"data: " + orjson.dumps(log_event.dict()) + b"\n\n"
+
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
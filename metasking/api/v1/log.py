@@ -1,13 +1,27 @@
-from datetime import datetime
-from typing import Optional
-
-from fastapi import Depends, APIRouter, HTTPException, Query, Body
-from sqlmodel import Session, select, func, col, or_
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import (
+    Depends,
+    APIRouter,
+    HTTPException,
+    Query,
+    Body,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, insert, update, func, col, or_, exists, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
 from metasking.db import use_session
 from metasking.model import (
     Log, LogCreate, LogCreateWithRecords,
-    LogReadWithRecords, LogUpdateWithRecords,
+    LogImport, LogImportChunk, LogImportResult,
+    LogReadWithRecords, LogBatchItem, LogUpdateWithRecords,
     Record, LogRecordUpdate,
     Task,
     Category,
@@ -16,39 +30,106 @@ from metasking.model import (
 from metasking.db import (
     pause_all_logs,
     resume_last_paused_log,
+    split_logs_at,
+    merge_logs_into,
     get_log_by_dynamic_id,
-    select_active_record,
+    get_logs_by_dynamic_ids,
+    get_log_detail_rows,
+    find_active_record,
+    close_open_records,
     apply_log_create,
+    find_name_id,
+    name_id_exists,
+    select_logs,
+    refresh_logs,
+    refresh_log,
+    update_log_summaries,
+    insert_logs,
+    check_ids_exist,
+    search_fulltext,
+    data_version,
+    emit_log_event,
+    LOG_LOADER_OPTIONS,
+    SINGLE_LOG_LOADER_OPTIONS,
+)
+from metasking.serialize import (
+    COLUMNAR_RESPONSE_CONTENT,
+    dump_log_line,
+    log_batch_response,
+    log_response,
+    logs_response,
+    log_columns,
+    columns_response,
+    negotiate_format,
+    format_etag,
+)
+from metasking.util import (
+    RequestTime,
+    check_read_only,
+    encode_cursor,
+    decode_cursor,
+    iter_lines,
+    not_modified,
 )
-from metasking.util import RequestTime, check_read_only
-# from metasking.asyncsessionfix import AsyncSession
 
 api = APIRouter(prefix="/log", tags=["log"])
 
+# Number of logs read from the database at once by the export
+EXPORT_CHUNK_SIZE = 500
 
-@api.get(
-    "/list",
-    response_model=list[LogReadWithRecords],
-    responses={
-        404: {"description": "Category or Task not found"},
-    },
-)
-def get_logs(
+# Maximum number of logs read by one batch request (or merged at once)
+BATCH_MAX_SIZE = 1000
+
+# Maximum number of day/week boundaries of one bulk split
+SPLIT_MAX_BOUNDARIES = 366
+
+# Number of logs inserted in one transaction by the import
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_CHUNK_SIZE = 10000
+
+
+def log_sort_key(order: str):
+    # Sort by start time of the last/first record
+    if order == "desc":
+        return col(Log.last_start)
+    else:
+        return col(Log.start)
+
+
+def order_logs(
+    selector: SelectOfScalar[Log],
+    order: str,
+) -> SelectOfScalar[Log]:
+    sort_key = log_sort_key(order)
+    # Logs without records are always listed last (database independent)
+    if order == "desc":
+        return selector.order_by(sort_key.desc().nulls_last()) \
+            .order_by(col(Log.id).desc())
+    else:
+        return selector.order_by(sort_key.asc().nulls_last()) \
+            .order_by(col(Log.id).asc())
+
+
+async def filter_logs(
+    session: AsyncSession,
+    selector: SelectOfScalar[Log],
     *,
-    session: Session = Depends(use_session),
-    offset: int = 0,
-    limit: int = Query(100, lte=1000),
-    category_id: Optional[int] = None,
-    task_id: Optional[int] = None,
-    category: Optional[str] = None,
-    task: Optional[str] = None,
-    description: Optional[str] = None,
-    stopped: Optional[bool] = None,
-    flags: Optional[list[str]] = Query(None),
-    order: str = Query("desc", regex="^(asc|desc)$"),
-    since: Optional[datetime] = None,
-    until: Optional[datetime] = None,
-):
+    category_id: Optional[int],
+    task_id: Optional[int],
+    category: Optional[str],
+    task: Optional[str],
+    description: Optional[str],
+    stopped: Optional[bool],
+    flags: Optional[list[str]],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Optional[SelectOfScalar[Log]]:
+    """
+    Apply the log list filters to the selector
+
+    Returns None if no log can match (unknown category/task name).
+    """
+
     if category is not None and category_id is not None:
         raise HTTPException(
             status_code=400,
@@ -60,34 +141,28 @@ def get_logs(
             detail="Use either task or task_id, not both"
         )
 
-    selector = select(Log)
     if category_id is not None:
-        db_category = session.get(Category, category_id)
-        if not db_category:
+        if not await name_id_exists(session, Category, category_id):
             raise HTTPException(status_code=404, detail="Category not found")
         selector = selector.where(Log.category_id == category_id)
     if task_id is not None:
-        db_task = session.get(Task, task_id)
-        if not db_task:
+        if not await name_id_exists(session, Task, task_id):
             raise HTTPException(status_code=404, detail="Task not found")
         selector = selector.where(Log.task_id == task_id)
     if category is not None:
-        db_category = session.exec(
-            select(Category)
-            .where(Category.name == category)
-        ).first()
-        if not db_category:
+        found_category_id = await find_name_id(session, Category, category)
+        if found_category_id is None:
             # No log has this category
             # raise HTTPException(status_code=404, detail="Category not found")
-            return []
-        selector = selector.where(Log.category_id == db_category.id)
+            return None
+        selector = selector.where(Log.category_id == found_category_id)
     if task is not None:
-        db_task = session.exec(select(Task).where(Task.name == task)).first()
-        if not db_task:
+        found_task_id = await find_name_id(session, Task, task)
+        if found_task_id is None:
             # No log has this task
             # raise HTTPException(status_code=404, detail="Task not found")
-            return []
-        selector = selector.where(Log.task_id == db_task.id)
+            return None
+        selector = selector.where(Log.task_id == found_task_id)
     if stopped is not None:
         selector = selector.where(Log.stopped == stopped)
 
@@ -100,64 +175,521 @@ def get_logs(
             )
 
     if flags is not None and len(flags) > 0:
-        # Mix in the flags
         # Logs without flags will disappear at this point
         # We don't support filtering for logs without flag(s)
-        selector = selector.join(LogFlag) \
+        selector = selector.where(col(Log.id).in_(
+            select(LogFlag.log_id)
             .where(col(LogFlag.flag).in_(flags))
+        ))
 
-    # Mix in the record for sorting and filtering
-    selector = selector.join(Record, isouter=True)
+    if since is not None or until is not None:
+        # Log needs a record matching the time range
+        record_selector = exists().where(col(Record.log_id) == col(Log.id))
+        if since is not None:
+            record_selector = record_selector.where(or_(
+                col(Record.start) >= since,
+                col(Record.end) >= since,
+            ))
+            # Implied by the record condition, narrows down the logs
+            selector = selector.where(or_(
+                col(Log.active),
+                col(Log.last_start) >= since,
+                col(Log.end) >= since,
+            ))
+        if until is not None:
+            record_selector = record_selector.where(or_(
+                col(Record.start) <= until,
+                col(Record.end) <= until,
+            ))
+            # Implied by the record condition, narrows down the logs
+            selector = selector.where(col(Log.start) <= until)
+        selector = selector.where(record_selector)
 
-    # Both flags and records need to be grouped by log id to avoid duplicates
-    selector = selector.group_by(Log.id)
+    return selector
 
-    # Order by start time of the last/first record
-    if order == "desc":
-        selector = selector.order_by(func.max(col(Record.start)).desc()) \
-            .order_by(col(Log.id).desc())
+
+async def query_logs(
+    *,
+    session: AsyncSession,
+    response: Response,
+    offset: int,
+    limit: int,
+    cursor: Optional[str],
+    category_id: Optional[int],
+    task_id: Optional[int],
+    category: Optional[str],
+    task: Optional[str],
+    description: Optional[str],
+    stopped: Optional[bool],
+    flags: Optional[list[str]],
+    order: str,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    load_relationships: bool = True,
+) -> list[Log]:
+    """
+    Page of logs matching the filters, the cursor of the next page
+    is set to the X-Next-Cursor header of the response
+    """
+
+    if cursor is not None and offset:
+        raise HTTPException(
+            status_code=400,
+            detail="Use either cursor or offset, not both"
+        )
+
+    filtered_selector = await filter_logs(
+        session,
+        select_logs() if load_relationships else select(Log),
+        category_id=category_id,
+        task_id=task_id,
+        category=category,
+        task=task,
+        description=description,
+        stopped=stopped,
+        flags=flags,
+        since=since,
+        until=until,
+    )
+    if filtered_selector is None:
+        return []
+    selector = order_logs(filtered_selector, order)
+    sort_key = log_sort_key(order)
+
+    cursor_key = None
+    if cursor is not None:
+        # Continue right after the last log of the previous page
+        cursor_key, cursor_id = decode_cursor(cursor, order)
+        if order == "desc":
+            after_id = col(Log.id) < cursor_id
+        else:
+            after_id = col(Log.id) > cursor_id
+        if cursor_key is None:
+            page_selector = selector \
+                .where(sort_key.is_(None)) \
+                .where(after_id)
+        elif order == "desc":
+            # Row value comparison allows an index range scan
+            page_selector = selector.where(
+                tuple_(sort_key, col(Log.id)) < tuple_(cursor_key, cursor_id)
+            )
+        else:
+            page_selector = selector.where(
+                tuple_(sort_key, col(Log.id)) > tuple_(cursor_key, cursor_id)
+            )
     else:
-        selector = selector.order_by(func.min(col(Record.start)).asc()) \
-            .order_by(col(Log.id).asc())
+        page_selector = selector.offset(offset)
 
-    if since is not None:
-        selector = selector.where(or_(
-            col(Record.start) >= since,
-            col(Record.end) >= since,
-        ))
-    if until is not None:
-        selector = selector.where(or_(
-            col(Record.start) <= until,
-            col(Record.end) <= until,
-        ))
+    result = await session.exec(page_selector.limit(limit))
+    logs = list(result.all())
 
-    selector = selector.offset(offset).limit(limit)
-    result = session.exec(selector)
-    logs = result.all()
+    if cursor is not None and cursor_key is not None and len(logs) < limit:
+        # Row value comparison skips logs without records, continue with them
+        result = await session.exec(
+            selector
+            .where(sort_key.is_(None))
+            .limit(limit - len(logs))
+        )
+        logs += result.all()
+
+    if len(logs) == limit:
+        last_log = logs[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            order,
+            last_log.last_start if order == "desc" else last_log.start,
+            last_log.id,
+        )
     return logs
 
 
+@api.get(
+    "/list",
+    response_model=list[LogReadWithRecords],
+    responses={
+        200: {"content": COLUMNAR_RESPONSE_CONTENT},
+        404: {"description": "Category or Task not found"},
+        400: {"description": "Invalid cursor"},
+    },
+)
+async def get_logs(
+    *,
+    session: AsyncSession = Depends(use_session),
+    request: Request,
+    response: Response,
+    offset: int = 0,
+    limit: int = Query(100, lte=1000),
+    cursor: Optional[str] = None,
+    category_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    category: Optional[str] = None,
+    task: Optional[str] = None,
+    description: Optional[str] = None,
+    stopped: Optional[bool] = None,
+    flags: Optional[list[str]] = Query(None),
+    order: str = Query("desc", regex="^(asc|desc)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Logs matching the filters, as LogReadWithRecords objects or (see
+    the Accept header) in the columnar layout as JSON or MessagePack
+    """
+
+    response_format = negotiate_format(request)
+    # Taken before the query, a change committed meanwhile makes
+    # the next request with this ETag read the logs again
+    etag = format_etag(data_version.etag(), response_format)
+    if cached := not_modified(request, etag):
+        cached.headers["Vary"] = "Accept"
+        return cached
+    response.headers["ETag"] = etag
+    response.headers["Vary"] = "Accept"
+
+    logs = await query_logs(
+        session=session,
+        response=response,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+        category_id=category_id,
+        task_id=task_id,
+        category=category,
+        task=task,
+        description=description,
+        stopped=stopped,
+        flags=flags,
+        order=order,
+        since=since,
+        until=until,
+        load_relationships=response_format == "json",
+    )
+    if response_format == "json":
+        return logs_response(logs, headers=response.headers)
+    details = await get_log_detail_rows(session, logs)
+    return columns_response(
+        log_columns(logs, details),
+        response_format,
+        headers=response.headers,
+    )
+
+
+@api.get(
+    "/batch",
+    response_model=list[LogBatchItem],
+    responses={
+        400: {"description": "Too many ids"},
+    },
+)
+async def get_log_batch(
+    *,
+    session: AsyncSession = Depends(use_session),
+    ids: list[int] = Query(),
+):
+    """
+    Logs by (dynamic) ids in the order of the ids, the log of an id
+    that was not found is null
+    """
+
+    if len(ids) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail="Too many ids")
+    db_logs = await get_logs_by_dynamic_ids(session, ids)
+    return log_batch_response(ids, db_logs)
+
+
+@api.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One LogReadWithRecords per line",
+            "content": {"application/x-ndjson": {}},
+        },
+        404: {"description": "Category or Task not found"},
+    },
+)
+async def export_logs(
+    *,
+    session: AsyncSession = Depends(use_session),
+    category_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    category: Optional[str] = None,
+    task: Optional[str] = None,
+    description: Optional[str] = None,
+    stopped: Optional[bool] = None,
+    flags: Optional[list[str]] = Query(None),
+    order: str = Query("desc", regex="^(asc|desc)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Stream all logs matching the filters (see /list) as newline-delimited
+    JSON, logs are read from the database in chunks
+    """
+
+    selector = await filter_logs(
+        session,
+        select_logs(),
+        category_id=category_id,
+        task_id=task_id,
+        category=category,
+        task=task,
+        description=description,
+        stopped=stopped,
+        flags=flags,
+        since=since,
+        until=until,
+    )
+
+    async def generate_lines():
+        if selector is None:
+            return
+        result = await session.stream_scalars(
+            order_logs(selector, order)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        async for db_logs in result.partitions():
+            yield b"".join(dump_log_line(db_log) for db_log in db_logs)
+
+    return StreamingResponse(
+        generate_lines(),
+        media_type="application/x-ndjson",
+    )
+
+
+@api.get(
+    "/search",
+    response_model=list[LogReadWithRecords],
+    responses={
+        404: {"description": "Category or Task not found"},
+        400: {"description": "Search query has no words"},
+    },
+)
+async def search_logs(
+    *,
+    session: AsyncSession = Depends(use_session),
+    q: str,
+    offset: int = 0,
+    limit: int = Query(100, lte=1000),
+    category_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    category: Optional[str] = None,
+    task: Optional[str] = None,
+    stopped: Optional[bool] = None,
+    flags: Optional[list[str]] = Query(None),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Full text search in log names and descriptions, logs containing all
+    words of the query (as prefixes) ordered by relevance.
+    The other filters are the same as in /list.
+    """
+
+    assert session.bind is not None
+    matches = search_fulltext(session.bind.dialect.name, q)
+    selector = await filter_logs(
+        session,
+        select_logs().join(matches, col(Log.id) == matches.c.log_id),
+        category_id=category_id,
+        task_id=task_id,
+        category=category,
+        task=task,
+        description=None,
+        stopped=stopped,
+        flags=flags,
+        since=since,
+        until=until,
+    )
+    if selector is None:
+        return []
+
+    result = await session.exec(
+        selector
+        .order_by(matches.c.rank, col(Log.id).desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    return logs_response(result.all())
+
+
+async def import_chunk(
+    session: AsyncSession,
+    result: LogImportResult,
+    offset: int,
+    logs: list[LogImport],
+    create_category: bool,
+    create_task: bool,
+):
+    """
+    Insert one chunk of imported logs in its own transaction,
+    failure of the chunk is reported in the result
+    """
+
+    chunk = LogImportChunk(
+        offset=offset,
+        logs=len(logs),
+        records=0,
+        log_ids=[],
+    )
+    try:
+        log_ids, records = await insert_logs(
+            session,
+            logs,
+            create_category,
+            create_task,
+        )
+        await session.commit()
+    except HTTPException as e:
+        await session.rollback()
+        chunk.error = e.detail
+    except IntegrityError as e:
+        await session.rollback()
+        chunk.error = f"Integrity error: {e.orig}"
+    else:
+        chunk.log_ids = log_ids
+        chunk.records = records
+        result.logs += len(log_ids)
+        result.records += records
+    result.chunks.append(chunk)
+
+
+@api.post(
+    "/import",
+    response_model=LogImportResult,
+    responses={
+        403: {"description": "Read only mode"},
+    },
+)
+async def import_logs(
+    *,
+    session: AsyncSession = Depends(use_session),
+    logs: list[LogImport] = Body(),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, gt=0, le=IMPORT_MAX_CHUNK_SIZE),
+    create_category: bool = Query(False, alias="create-category"),
+    create_task: bool = Query(False, alias="create-task"),
+):
+    """
+    Create logs with records in bulk, every chunk of logs is inserted
+    in a separate transaction (failed chunks are skipped and reported)
+    """
+
+    check_read_only()
+    result = LogImportResult()
+    for offset in range(0, len(logs), chunk_size):
+        await import_chunk(
+            session,
+            result,
+            offset,
+            logs[offset:offset + chunk_size],
+            create_category,
+            create_task,
+        )
+    return result
+
+
+@api.post(
+    "/import/ndjson",
+    response_model=LogImportResult,
+    responses={
+        403: {"description": "Read only mode"},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/LogImport"},
+                },
+            },
+        },
+    },
+)
+async def import_logs_ndjson(
+    *,
+    session: AsyncSession = Depends(use_session),
+    request: Request,
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, gt=0, le=IMPORT_MAX_CHUNK_SIZE),
+    create_category: bool = Query(False, alias="create-category"),
+    create_task: bool = Query(False, alias="create-task"),
+):
+    """
+    Same as /import but reads one LogImport per line while the request
+    body is being received (see /export for the format)
+    NOTE: import stops at the first invalid line
+    """
+
+    check_read_only()
+    result = LogImportResult()
+    offset = 0
+    logs: list[LogImport] = []
+    line_number = 0
+    async for line in iter_lines(request.stream()):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            logs.append(LogImport.parse_raw(line))
+        except ValidationError as e:
+            result.chunks.append(LogImportChunk(
+                offset=offset,
+                logs=len(logs) + 1,
+                records=0,
+                log_ids=[],
+                error=f"Invalid log on line {line_number}: {e}",
+            ))
+            return result
+        if len(logs) == chunk_size:
+            await import_chunk(
+                session,
+                result,
+                offset,
+                logs,
+                create_category,
+                create_task,
+            )
+            offset += len(logs)
+            logs = []
+    if logs:
+        await import_chunk(
+            session,
+            result,
+            offset,
+            logs,
+            create_category,
+            create_task,
+        )
+    return result
+
+
 @api.post(
     "/",
     response_model=LogReadWithRecords,
     responses={
         403: {"description": "Read only mode"},
+        404: {"description": "Category or Task not found"},
     },
 )
-def create_log(
+async def create_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     log: LogCreateWithRecords = Body(),
 ):
     check_read_only()
+    if log.category_id is not None:
+        await check_ids_exist(session, Category, {log.category_id})
+    if log.task_id is not None:
+        await check_ids_exist(session, Task, {log.task_id})
     db_log = Log.from_orm(log)
     for record in log.records or []:
         db_record = Record.from_orm(record)
         db_log.records.append(db_record)
     session.add(db_log)
-    session.commit()
-    session.refresh(db_log)
-    return db_log
+    await session.flush()
+    await update_log_summaries(session, [db_log.id])
+    emit_log_event(session, "create", db_log)
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.post(
@@ -167,9 +699,9 @@ def create_log(
         403: {"description": "Read only mode"},
     },
 )
-def start_log(
+async def start_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     request_time: RequestTime,
     log: Optional[LogCreate] = Body(),
     create_category: bool = Query(False, alias="create-category"),
@@ -178,7 +710,7 @@ def start_log(
     check_read_only()
 
     # Create a new log
-    db_log = apply_log_create(
+    db_log = await apply_log_create(
         session,
         request_time,
         log,
@@ -187,13 +719,16 @@ def start_log(
     )
 
     # Pause all active logs
-    pause_all_logs(session, request_time)
+    paused_log_ids = await pause_all_logs(session, request_time)
 
     # Save the new log
     session.add(db_log)
-    session.commit()
-    session.refresh(db_log)
-    return db_log
+    await session.flush()
+    await update_log_summaries(session, [*paused_log_ids, db_log.id])
+    emit_log_event(session, "start", db_log)
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.post(
@@ -203,9 +738,9 @@ def start_log(
         403: {"description": "Read only mode"},
     },
 )
-def next_log(
+async def next_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     request_time: RequestTime,
     log: Optional[LogCreate] = Body(),
     create_category: bool = Query(False, alias="create-category"),
@@ -214,7 +749,7 @@ def next_log(
     check_read_only()
 
     # Create a new log
-    db_log = apply_log_create(
+    db_log = await apply_log_create(
         session,
         request_time,
         log,
@@ -223,28 +758,24 @@ def next_log(
     )
 
     # Stop the active log
-    result = session.exec(select_active_record())
-    db_record = result.first()
-    if db_record:
-        if db_record.start > request_time:
-            # Someone has shifted the time too much :D
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    "Cannot pause a record that has not " +
-                    "started yet (start is in the future)"
-                )
-            )
-        db_record.end = request_time
-        session.add(db_record)
-        db_record.log.stopped = True
-        session.add(db_record.log)
+    stopped_log_ids = await close_open_records(session, request_time)
+    if stopped_log_ids:
+        result = await session.exec(
+            select(Log).where(col(Log.id).in_(stopped_log_ids))
+        )
+        for db_active_log in result.all():
+            db_active_log.stopped = True
+            session.add(db_active_log)
+            emit_log_event(session, "stop", db_active_log)
 
     # Save the new log
     session.add(db_log)
-    session.commit()
-    session.refresh(db_log)
-    return db_log
+    await session.flush()
+    await update_log_summaries(session, [*stopped_log_ids, db_log.id])
+    emit_log_event(session, "next", db_log)
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.post(
@@ -255,9 +786,9 @@ def next_log(
         400: {"description": "All logs already stopped"},
     },
 )
-def stop_all_logs(
+async def stop_all_logs(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     category_id: Optional[int] = None,
     task_id: Optional[int] = None,
     category: Optional[str] = None,
@@ -282,32 +813,27 @@ def stop_all_logs(
         .where(col(Log.stopped).is_(False))
 
     if category_id is not None:
-        db_category = session.get(Category, category_id)
-        if not db_category:
+        if not await name_id_exists(session, Category, category_id):
             raise HTTPException(status_code=404, detail="Category not found")
         selector = selector.where(Log.category_id == category_id)
     if task_id is not None:
-        db_task = session.get(Task, task_id)
-        if not db_task:
+        if not await name_id_exists(session, Task, task_id):
             raise HTTPException(status_code=404, detail="Task not found")
         selector = selector.where(Log.task_id == task_id)
     if category is not None:
-        db_category = session.exec(
-            select(Category)
-            .where(Category.name == category)
-        ).first()
-        if not db_category:
+        found_category_id = await find_name_id(session, Category, category)
+        if found_category_id is None:
             # No log has this category
             # raise HTTPException(status_code=404, detail="Category not found")
             return []
-        selector = selector.where(Log.category_id == db_category.id)
+        selector = selector.where(Log.category_id == found_category_id)
     if task is not None:
-        db_task = session.exec(select(Task).where(Task.name == task)).first()
-        if not db_task:
+        found_task_id = await find_name_id(session, Task, task)
+        if found_task_id is None:
             # No log has this task
             # raise HTTPException(status_code=404, detail="Task not found")
             return []
-        selector = selector.where(Log.task_id == db_task.id)
+        selector = selector.where(Log.task_id == found_task_id)
 
     if flags is not None and len(flags) > 0:
         # Mix in the flags
@@ -316,34 +842,46 @@ def stop_all_logs(
         selector = selector.join(LogFlag) \
             .where(col(LogFlag.flag).in_(flags))
 
-    result = session.exec(selector)
-    db_logs = result.all()
-    if not db_logs:
+    # Stop the matching logs with one statement
+    log_ids_selector = selector.with_only_columns(col(Log.id))
+    statement = update(Log) \
+        .values(stopped=True) \
+        .execution_options(
+            synchronize_session=False,
+            # Logs are named by update_log_summaries
+            changed_log_ids=(),
+        )
+    if session.bind.dialect.update_returning:
+        result = await session.execute(
+            statement
+            .where(col(Log.id).in_(log_ids_selector))
+            .returning(col(Log.id))
+        )
+        log_ids = list(result.scalars().all())
+    else:
+        result_ids = await session.exec(log_ids_selector)
+        log_ids = list(dict.fromkeys(result_ids.all()))
+        if log_ids:
+            await session.execute(
+                statement.where(col(Log.id).in_(log_ids))
+            )
+    if not log_ids:
         raise HTTPException(status_code=400, detail="All logs already stopped")
+
+    await close_open_records(session, request_time, log_ids)
+    await update_log_summaries(session, log_ids)
+
+    result_logs = await session.exec(
+        select_logs()
+        .where(col(Log.id).in_(log_ids))
+        .order_by(col(Log.id))
+        .execution_options(populate_existing=True)
+    )
+    db_logs = result_logs.all()
     for db_log in db_logs:
-        selectorR = select(Record) \
-            .where(Record.log_id == db_log.id) \
-            .where(col(Record.end).is_(None))
-        resultR = session.exec(selectorR)
-        db_records = resultR.all()
-        for db_record in db_records:
-            if db_record.start > request_time:
-                # Someone has shifted the time too much :D
-                raise HTTPException(
-                    status_code=400,
-                    detail=(
-                        "Cannot pause a record that has not " +
-                        "started yet (start is in the future)"
-                    )
-                )
-            db_record.end = request_time
-            session.add(db_record)
-        db_log.stopped = True
-        session.add(db_log)
-    session.commit()
-    for db_log in db_logs:
-        session.refresh(db_log)
-    return db_logs
+        emit_log_event(session, "stop", db_log)
+    await session.commit()
+    return logs_response(db_logs)
 
 
 @api.post(
@@ -354,46 +892,36 @@ def stop_all_logs(
         404: {"description": "No active log found"},
     },
 )
-def stop_active_log(
+async def stop_active_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     request_time: RequestTime,
 ):
     check_read_only()
 
-    selector = select(Record) \
-        .where(col(Record.end).is_(None)) \
-        .order_by(col(Record.start).desc()) \
-        .limit(1)
-    result = session.exec(selector)
-    db_record = result.first()
-    if not db_record:
+    active = await find_active_record(session)
+    if not active:
         raise HTTPException(status_code=404, detail="No active log found")
-    db_log = db_record.log
+    db_log = await session.get(Log, active.log_id)
+    assert db_log
     assert not db_log.stopped
     db_log.stopped = True
     session.add(db_log)
 
     # Write the end time to the last record
-    if db_record.start > request_time:
-        # Someone has shifted the time too much :D
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                "Cannot pause a record that has not " +
-                "started yet (start is in the future)"
-            )
-        )
-    db_record.end = request_time
-    session.add(db_record)
-
-    session.commit()
+    await close_open_records(session, request_time, [db_log.id])
+    emit_log_event(session, "stop", db_log)
 
     # Resume last paused log if any
-    resume_last_paused_log(session, request_time)
+    db_resumed_log = await resume_last_paused_log(session, request_time)
+    await update_log_summaries(
+        session,
+        [db_log.id, db_resumed_log.id if db_resumed_log else None],
+    )
 
-    session.refresh(db_log)
-    return db_log
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.post(
@@ -405,51 +933,38 @@ def stop_active_log(
         400: {"description": "Log already stopped"},
     },
 )
-def stop_log(
+async def stop_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     request_time: RequestTime,
     dynamic_log_id: int,
 ):
     check_read_only()
 
-    db_log = get_log_by_dynamic_id(session, dynamic_log_id)
+    db_log = await get_log_by_dynamic_id(session, dynamic_log_id)
     if db_log.stopped:
         raise HTTPException(status_code=400, detail="Log already stopped")
     db_log.stopped = True
     session.add(db_log)
 
-    was_active = False
-
     # Write the end time to the last record if the log is not already paused
-    selector = select(Record) \
-        .where(Record.log_id == db_log.id) \
-        .order_by(col(Record.start).desc()) \
-        .limit(1)
-    result = session.exec(selector)
-    db_record = result.first()
-    if db_record and not db_record.end:
-        if db_record.start > request_time:
-            # Someone has shifted the time too much :D
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    "Cannot pause a record that has not " +
-                    "started yet (start is in the future)"
-                )
-            )
-        was_active = True
-        db_record.end = request_time
-        session.add(db_record)
-
-    session.commit()
+    was_active = bool(
+        await close_open_records(session, request_time, [db_log.id])
+    )
+    emit_log_event(session, "stop", db_log)
 
+    db_resumed_log = None
     if was_active:
         # Resume last paused log if any
-        resume_last_paused_log(session, request_time)
+        db_resumed_log = await resume_last_paused_log(session, request_time)
+    await update_log_summaries(
+        session,
+        [db_log.id, db_resumed_log.id if db_resumed_log else None],
+    )
 
-    session.refresh(db_log)
-    return db_log
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.post(
@@ -460,32 +975,24 @@ def stop_log(
         404: {"description": "No active log found"},
     },
 )
-def pause_active_log(
+async def pause_active_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     request_time: RequestTime,
 ):
     check_read_only()
 
-    result = session.exec(select_active_record())
-    db_record = result.first()
-    if not db_record:
+    active = await find_active_record(session)
+    if not active:
         raise HTTPException(status_code=404, detail="No active log found")
-    db_log = db_record.log
-    if db_record.start > request_time:
-        # Someone has shifted the time too much :D
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                "Cannot pause a record that has not " +
-                "started yet (start is in the future)"
-            )
-        )
-    db_record.end = request_time
-    session.add(db_record)
-    session.commit()
-    session.refresh(db_log)
-    return db_log
+    db_log = await session.get(Log, active.log_id)
+    assert db_log
+    await close_open_records(session, request_time, [db_log.id])
+    await update_log_summaries(session, [db_log.id])
+    emit_log_event(session, "pause", db_log)
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.post(
@@ -497,44 +1004,29 @@ def pause_active_log(
         400: {"description": "Log already paused/stopped"},
     },
 )
-def pause_log(
+async def pause_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     request_time: RequestTime,
     log_id: int,
 ):
     check_read_only()
 
-    db_log = session.get(Log, log_id)
+    db_log = await session.get(Log, log_id)
     if not db_log:
         raise HTTPException(status_code=404, detail="Log not found")
     if db_log.stopped:
         raise HTTPException(status_code=400, detail="Log already stopped")
 
     # Write the end time to the last record if the log is not already paused
-    selector = select(Record) \
-        .where(Record.log_id == db_log.id) \
-        .order_by(col(Record.start).desc()) \
-        .limit(1)
-    result = session.exec(selector)
-    db_record = result.first()
-    if not db_record or db_record.end:
+    if not await close_open_records(session, request_time, [db_log.id]):
         raise HTTPException(status_code=400, detail="Log already paused")
-    if db_record.start > request_time:
-        # Someone has shifted the time too much :D
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                "Cannot pause a record that has not " +
-                "started yet (start is in the future)"
-            )
-        )
-    db_record.end = request_time
-    session.add(db_record)
+    await update_log_summaries(session, [db_log.id])
+    emit_log_event(session, "pause", db_log)
 
-    session.commit()
-    session.refresh(db_log)
-    return db_log
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.post(
@@ -543,56 +1035,33 @@ def pause_log(
     responses={
         403: {"description": "Read only mode"},
         404: {"description": "Log not found"},
-        400: {"description": "Log already running"},
-        500: {
-            "description":
-            "Log state mismatch (could happen " +
-                "when manually editing the logged records)"
-        },
     },
 )
-def resume_log(
+async def resume_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     request_time: RequestTime,
     dynamic_log_id: int,
 ):
     check_read_only()
 
-    db_log = get_log_by_dynamic_id(session, dynamic_log_id)
-
-    pause_all_logs(session, request_time)
+    db_log = await get_log_by_dynamic_id(session, dynamic_log_id)
 
-    was_stopped = db_log.stopped
+    # Pausing all logs closes the open record of this log too
+    paused_log_ids = await pause_all_logs(session, request_time)
 
     if db_log.stopped:
         db_log.stopped = False
         session.add(db_log)
-        session.commit()
-
-    # Check if record is paused
-    selector = select(Record) \
-        .where(Record.log_id == db_log.id) \
-        .order_by(col(Record.start).desc()) \
-        .limit(1)
-    result = session.exec(selector)
-    db_record = result.first()
-    if db_record and not db_record.end:
-        if was_stopped:
-            raise HTTPException(status_code=500, detail=(
-                "Log state mismatch: " +
-                "Log was stopped but record is not paused: " +
-                "Log is now set as running to fix the mismatch"
-            ))
-        else:
-            raise HTTPException(status_code=400, detail="Log already running")
 
     # Start a new record
     session.add(Record(log_id=db_log.id, start=request_time))
+    await update_log_summaries(session, [*paused_log_ids, db_log.id])
+    emit_log_event(session, "resume", db_log)
 
-    session.commit()
-    session.refresh(db_log)
-    return db_log
+    await session.commit()
+    await refresh_log(session, db_log)
+    return log_response(db_log)
 
 
 @api.get(
@@ -602,15 +1071,25 @@ def resume_log(
         404: {"description": "No active log found"},
     },
 )
-def get_active_log(
+async def get_active_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
+    request: Request,
 ):
-    result = session.exec(select_active_record())
-    db_record = result.first()
-    if not db_record:
+    etag = data_version.etag()
+    if cached := not_modified(request, etag):
+        return cached
+
+    active = await find_active_record(session)
+    if not active:
         raise HTTPException(status_code=404, detail="No active log found")
-    return db_record.log
+    db_log = await session.get(
+        Log,
+        active.log_id,
+        options=SINGLE_LOG_LOADER_OPTIONS,
+    )
+    assert db_log
+    return log_response(db_log, headers={"ETag": etag})
 
 
 @api.get(
@@ -620,12 +1099,21 @@ def get_active_log(
         404: {"description": "Log not found"},
     }
 )
-def read_log(
+async def read_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
+    request: Request,
     dynamic_log_id: int,
 ):
-    return get_log_by_dynamic_id(session, dynamic_log_id)
+    # Dynamic ids (counted from the most recent log) depend on all logs
+    etag = data_version.etag(
+        dynamic_log_id if dynamic_log_id >= 0 else None
+    )
+    if cached := not_modified(request, etag):
+        return cached
+
+    db_log = await get_log_by_dynamic_id(session, dynamic_log_id)
+    return log_response(db_log, headers={"ETag": etag})
 
 
 @api.put(
@@ -636,26 +1124,31 @@ def read_log(
         404: {"description": "Log/Category/Task not found"},
     },
 )
-def update_active_log(
+async def update_active_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     log: LogUpdateWithRecords = Body(),
     create_category: bool = Query(False, alias="create-category"),
     create_task: bool = Query(False, alias="create-task"),
 ):
     check_read_only()
-    result = session.exec(select_active_record())
-    db_record = result.first()
-    if not db_record:
+    active = await find_active_record(session)
+    if not active:
         raise HTTPException(status_code=404, detail="No active log found")
-    db_log = db_record.log
-    return update_log(
+    db_log = await session.get(
+        Log,
+        active.log_id,
+        options=LOG_LOADER_OPTIONS,
+    )
+    assert db_log
+    db_log = await update_log(
         session,
         db_log,
         log,
         create_category,
         create_task,
     )
+    return log_response(db_log)
 
 
 @api.put(
@@ -666,71 +1159,73 @@ def update_active_log(
         404: {"description": "Log/Category/Task not found"},
     },
 )
-def update_exact_log(
+async def update_exact_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     dynamic_log_id: int,
     log: LogUpdateWithRecords = Body(),
     create_category: bool = Query(False, alias="create-category"),
     create_task: bool = Query(False, alias="create-task"),
 ):
     check_read_only()
-    db_log = get_log_by_dynamic_id(session, dynamic_log_id)
-    return update_log(
+    db_log = await get_log_by_dynamic_id(session, dynamic_log_id)
+    db_log = await update_log(
         session,
         db_log,
         log,
         create_category,
         create_task,
     )
+    return log_response(db_log)
 
 
-def update_log(
-    session: Session,
+async def update_log(
+    session: AsyncSession,
     db_log: Log,
     log: LogUpdateWithRecords,
     create_category: bool,
     create_task: bool,
 ):
+    """
+    NOTE: expects the log to be loaded with LOG_LOADER_OPTIONS
+    """
+
+    # Records of any log can be updated
+    updated_log_ids = [db_log.id]
+
     log_data = log.dict(exclude_unset=True)
     for key, value in log_data.items():
         if key == "category":
             if value is None:
-                db_category = None
+                db_log.category = None
+                continue
+            category_id = await find_name_id(session, Category, value)
+            if category_id is not None:
+                db_log.category_id = category_id
+            elif create_category:
+                db_log.category = Category(name=value)
             else:
-                selectorC = select(Category) \
-                    .where(Category.name == value)
-                resultC = session.exec(selectorC)
-                db_category = resultC.first()
-                if not db_category:
-                    if create_category:
-                        db_category = Category(name=value)
-                    else:
-                        raise HTTPException(
-                            status_code=404,
-                            detail="Category not found"
-                        )
-            db_log.category = db_category
+                raise HTTPException(
+                    status_code=404,
+                    detail="Category not found"
+                )
         elif key == "task":
             if value is None:
-                db_task = None
+                db_log.task = None
+                continue
+            task_id = await find_name_id(session, Task, value)
+            if task_id is not None:
+                db_log.task_id = task_id
+            elif create_task:
+                db_log.task = Task(name=value)
             else:
-                selectorT = select(Task) \
-                    .where(Task.name == value)
-                resultT = session.exec(selectorT)
-                db_task = resultT.first()
-                if not db_task:
-                    if create_task:
-                        db_task = Task(name=value)
-                    else:
-                        raise HTTPException(
-                            status_code=404,
-                            detail="Task not found"
-                        )
-            db_log.task = db_task
+                raise HTTPException(
+                    status_code=404,
+                    detail="Task not found"
+                )
         elif key == "flags":
             for flag in db_log.flags:
-                session.delete(flag)
+                await session.delete(flag)
 
             if value is None:
                 db_log.flags = []
@@ -747,7 +1242,7 @@ def update_log(
                 for key2, value2 in record_data.items():
                     setattr(record, key2, value2)
                 if record.id:
-                    db_record = session.get(Record, record.id)
+                    db_record = await session.get(Record, record.id)
                     if not db_record:
                         raise HTTPException(
                             status_code=404,
@@ -756,6 +1251,7 @@ def update_log(
                     for key2, value2 in record_data.items():
                         setattr(db_record, key2, value2)
                     session.add(db_record)
+                    updated_log_ids.append(db_record.log_id)
                 else:
                     db_record = Record.from_orm(record)
                     db_log.records.append(db_record)
@@ -763,8 +1259,10 @@ def update_log(
         else:
             setattr(db_log, key, value)
     session.add(db_log)
-    session.commit()
-    session.refresh(db_log)
+    await update_log_summaries(session, updated_log_ids)
+    emit_log_event(session, "update", db_log)
+    await session.commit()
+    await refresh_log(session, db_log)
     return db_log
 
 
@@ -776,109 +1274,220 @@ def update_log(
         404: {"description": "Log not found"},
     },
 )
-def delete_log(
+async def delete_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     dynamic_log_id: int,
 ):
     check_read_only()
-    db_log = get_log_by_dynamic_id(session, dynamic_log_id)
-    session.refresh(db_log, attribute_names=[
-        "task",
-        "category",
-        "flags",
-        "records",
-    ])
+    db_log = await get_log_by_dynamic_id(session, dynamic_log_id)
     for db_record in db_log.records:
-        session.delete(db_record)
-    session.delete(db_log)
-    session.commit()
-    return db_log
+        await session.delete(db_record)
+    await session.delete(db_log)
+    emit_log_event(session, "delete", db_log)
+    await session.commit()
+    return log_response(db_log)
+
+
+def split_part_row(db_log: Log) -> dict[str, Any]:
+    # New log continuing the log after a split
+    return {
+        "category_id": db_log.category_id,
+        "task_id": db_log.task_id,
+        "meta": db_log.meta,
+        "stopped": db_log.stopped,
+        "name": db_log.name,
+        "description": db_log.description,
+        # Computed by update_log_summaries
+        "active": False,
+        "total_duration": 0,
+    }
+
+
+def split_boundaries(
+    since: datetime,
+    until: datetime,
+    by: str,
+) -> list[datetime]:
+    """
+    Day (midnight) or week (Monday midnight) boundaries within
+    the time window [since, until]
+    """
+
+    boundary = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    step = timedelta(days=1)
+    if by == "week":
+        boundary -= timedelta(days=boundary.weekday())
+        step = timedelta(weeks=1)
+    if boundary < since:
+        boundary += step
+    boundaries = []
+    while boundary <= until and len(boundaries) <= SPLIT_MAX_BOUNDARIES:
+        boundaries.append(boundary)
+        boundary += step
+    return boundaries
 
 
 @api.post(
-    "/{dynamic_log_id}/split",
+    "/split",
     response_model=list[LogReadWithRecords],
+    responses={
+        403: {"description": "Read only mode"},
+        400: {"description": "Invalid time window"},
+    },
 )
-def split_log(
+async def split_logs(
     *,
-    session: Session = Depends(use_session),
-    dynamic_log_id: int,
-    at: datetime,
+    session: AsyncSession = Depends(use_session),
+    request_time: RequestTime,
+    since: datetime,
+    until: datetime,
+    by: str = Query("day", regex="^(day|week)$"),
 ):
+    """
+    Split every log overlapping the time window at each day or week
+    boundary within the window (see /{dynamic_log_id}/split),
+    returns the split logs and their new parts
+    """
+
     check_read_only()
-    db_log = get_log_by_dynamic_id(session, dynamic_log_id)
-
-    db_log2 = Log(
-        category_id=db_log.category_id,
-        task_id=db_log.task_id,
-        meta=db_log.meta,
-        stopped=db_log.stopped,
-        name=db_log.name,
-        description=db_log.description,
+    if until <= since:
+        raise HTTPException(
+            status_code=400,
+            detail="Until must be after since"
+        )
+    boundaries = split_boundaries(since, until, by)
+    if len(boundaries) > SPLIT_MAX_BOUNDARIES:
+        raise HTTPException(status_code=400, detail="Too many boundaries")
+    if not boundaries:
+        return []
+
+    result = await session.exec(
+        select(Log)
+        .where(col(Log.start) < boundaries[-1])
+        .where(or_(col(Log.end).is_(None), col(Log.end) > boundaries[0]))
+        .order_by(col(Log.id))
     )
+    db_logs = result.all()
 
-    db_log.stopped = True
-    session.add(db_log)
-
-    # Find if any record contains the split time and split it
-    selector = select(Record) \
-        .where(Record.log_id == db_log.id) \
-        .where(Record.start < at) \
-        .where(or_(col(Record.end).is_(None), col(Record.end) > at))
-    result = session.exec(selector)
-    for db_record in result:
-        db_record2 = Record(
-            meta=db_record.meta,
-            start=at,
-            end=db_record.end,
+    # Last part of every log (records after the previous boundary)
+    part_ids = {db_log.id: db_log.id for db_log in db_logs}
+    split_pairs: list[tuple[int, int]] = []
+    for boundary in boundaries:
+        db_candidate_logs = [
+            db_log
+            for db_log in db_logs
+            if db_log.start is not None and
+            db_log.start < boundary < (db_log.end or request_time)
+        ]
+        if not db_candidate_logs:
+            continue
+        # Current parts with records on both sides of the boundary
+        # (a gap in the records would leave an empty part)
+        result_parts = await session.exec(
+            select(Record.log_id)
+            .where(col(Record.log_id).in_(
+                part_ids[db_log.id] for db_log in db_candidate_logs
+            ))
+            .group_by(col(Record.log_id))
+            .having(func.min(col(Record.start)) < boundary)
+            .having(
+                func.max(func.coalesce(col(Record.end), request_time)) >
+                boundary
+            )
         )
-        db_log2.records.append(db_record2)
-        db_record.end = at
-        session.add(db_record)
-
-    # Find all records after the split time and move them to the new log
-    selector = select(Record) \
-        .where(Record.log_id == db_log.id) \
-        .where(Record.start >= at)
-    result = session.exec(selector)
-    for db_record in result:
-        db_log2.records.append(db_record)
-
-    # Save the new log
-    session.add(db_log2)
-
-    session.commit()
-    session.refresh(db_log)
-    session.refresh(db_log2)
-    return [db_log, db_log2]
+        crossing_part_ids = set(result_parts.all())
+        db_crossing_logs = [
+            db_log
+            for db_log in db_candidate_logs
+            if part_ids[db_log.id] in crossing_part_ids
+        ]
+        if not db_crossing_logs:
+            continue
+
+        # Ids in parameter order (see insert_logs),
+        # new logs are named by update_log_summaries
+        result = await session.execute(
+            insert(Log)
+            .returning(col(Log.id), sort_by_parameter_order=True)
+            .execution_options(changed_log_ids=()),
+            [split_part_row(db_log) for db_log in db_crossing_logs],
+        )
+        new_part_ids = list(result.scalars())
+        old_part_ids = [part_ids[db_log.id] for db_log in db_crossing_logs]
+        await session.execute(
+            update(Log)
+            .where(col(Log.id).in_(old_part_ids))
+            .values(stopped=True)
+            .execution_options(
+                synchronize_session=False,
+                changed_log_ids=set(old_part_ids),
+            )
+        )
+        await split_logs_at(
+            session,
+            dict(zip(old_part_ids, new_part_ids)),
+            boundary,
+        )
+        split_pairs += zip(old_part_ids, new_part_ids)
+        for db_log, new_part_id in zip(db_crossing_logs, new_part_ids):
+            part_ids[db_log.id] = new_part_id
+
+    if not split_pairs:
+        return []
+    split_log_ids = {log_id for pair in split_pairs for log_id in pair}
+    await update_log_summaries(session, split_log_ids)
+    result_logs = await session.exec(
+        select_logs()
+        .where(col(Log.id).in_(split_log_ids))
+        .order_by(col(Log.id))
+        .execution_options(populate_existing=True)
+    )
+    db_split_logs = result_logs.all()
+    db_split_log_by_id = {db_log.id: db_log for db_log in db_split_logs}
+    for log_id, new_part_id in split_pairs:
+        emit_log_event(
+            session,
+            "split",
+            db_split_log_by_id[log_id],
+            db_split_log_by_id[new_part_id],
+        )
+    await session.commit()
+    return logs_response(db_split_logs)
 
 
 @api.post(
-    "/{log_id}/merge/{with_log_id}",
-    response_model=LogReadWithRecords,
-    responses={
-        404: {"description": "Log not found"},
-    },
+    "/{dynamic_log_id}/split",
+    response_model=list[LogReadWithRecords],
 )
-def merge_log(
+async def split_log(
     *,
-    session: Session = Depends(use_session),
-    log_id: int,
-    with_log_id: int,
+    session: AsyncSession = Depends(use_session),
+    dynamic_log_id: int,
+    at: datetime,
 ):
-    db_log = session.get(Log, log_id)
-    if not db_log:
-        raise HTTPException(status_code=404, detail="Log not found")
-    db_log2 = session.get(Log, with_log_id)
-    if not db_log2:
-        raise HTTPException(status_code=404, detail="Log not found")
+    check_read_only()
+    db_log = await get_log_by_dynamic_id(session, dynamic_log_id)
+
+    db_log2 = Log(**split_part_row(db_log))
+    db_log.stopped = True
+    session.add(db_log)
+
+    # Save the new log and move the records after the split time
+    session.add(db_log2)
+    await session.flush()
+    await split_logs_at(session, {db_log.id: db_log2.id}, at)
+    await update_log_summaries(session, [db_log.id, db_log2.id])
+    emit_log_event(session, "split", db_log, db_log2)
+
+    await session.commit()
+    return logs_response(await refresh_logs(session, [db_log, db_log2]))
 
-    # Move all records from the second log to the first log
-    for db_record in db_log2.records:
-        db_log.records.append(db_record)
 
-    # Merge properties
+def merge_log_properties(db_log: Log, db_log2: Log):
+    """
+    Merge properties of the second log into the first log
+    """
 
     # Keep both names
     if db_log.name != db_log2.name:
@@ -903,18 +1512,96 @@ def merge_log(
 
     # Merge meta - prefer the first log meta if any
     # Add second log meta to the first log meta if both exist
+    # (assign a new dict, in-place changes of JSON are not tracked)
     if db_log.meta != db_log2.meta:
         if db_log.meta is None:
             db_log.meta = db_log2.meta
         elif db_log2.meta is not None:
-            db_log.meta["_merged"] = db_log2.meta
+            db_log.meta = {**db_log.meta, "_merged": db_log2.meta}
+
+
+async def merge_logs(
+    session: AsyncSession,
+    log_id: int,
+    with_log_ids: list[int],
+) -> Log:
+    """
+    Merge the logs into the log one by one and delete them
+    """
 
-    # Delete the second log
-    session.delete(db_log2)
+    if log_id in with_log_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot merge a log with itself"
+        )
+    db_log = await session.get(Log, log_id)
+    if not db_log:
+        raise HTTPException(status_code=404, detail="Log not found")
+    result = await session.exec(
+        select(Log).where(col(Log.id).in_(with_log_ids))
+    )
+    db_found_logs = {db_log2.id: db_log2 for db_log2 in result.all()}
+    if len(db_found_logs) != len(set(with_log_ids)):
+        raise HTTPException(status_code=404, detail="Log not found")
+    db_other_logs = [
+        db_found_logs[with_log_id] for with_log_id in with_log_ids
+    ]
 
-    # Save the first log
+    for db_log2 in db_other_logs:
+        merge_log_properties(db_log, db_log2)
     session.add(db_log)
 
-    session.commit()
-    session.refresh(db_log)
-    return db_log
+    # Move records and flags, delete the merged logs
+    await merge_logs_into(session, log_id, list(db_found_logs))
+    await update_log_summaries(session, [log_id])
+    for db_log2 in db_other_logs:
+        emit_log_event(session, "merge", db_log, db_log2)
+
+    await session.commit()
+    return await refresh_log(session, db_log)
+
+
+@api.post(
+    "/{log_id}/merge",
+    response_model=LogReadWithRecords,
+    responses={
+        403: {"description": "Read only mode"},
+        404: {"description": "Log not found"},
+        400: {"description": "Cannot merge a log with itself"},
+    },
+)
+async def merge_many_logs(
+    *,
+    session: AsyncSession = Depends(use_session),
+    log_id: int,
+    ids: list[int] = Query(),
+):
+    """
+    Merge the logs into the log in the order of the ids
+    (see /{log_id}/merge/{with_log_id})
+    """
+
+    check_read_only()
+    if len(ids) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail="Too many ids")
+    with_log_ids = list(dict.fromkeys(ids))
+    return log_response(await merge_logs(session, log_id, with_log_ids))
+
+
+@api.post(
+    "/{log_id}/merge/{with_log_id}",
+    response_model=LogReadWithRecords,
+    responses={
+        403: {"description": "Read only mode"},
+        404: {"description": "Log not found"},
+        400: {"description": "Cannot merge a log with itself"},
+    },
+)
+async def merge_log(
+    *,
+    session: AsyncSession = Depends(use_session),
+    log_id: int,
+    with_log_id: int,
+):
+    check_read_only()
+    return log_response(await merge_logs(session, log_id, [with_log_id]))
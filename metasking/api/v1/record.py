@@ -1,37 +1,164 @@
-from fastapi import Depends, APIRouter, HTTPException, Body
-from sqlmodel import Session
+from datetime import datetime
+from typing import Optional
 
-from metasking.db import use_session
+from fastapi import Depends, APIRouter, HTTPException, Body, Query, Request
+from sqlmodel import select, col
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from metasking.db import (
+    use_session, LOG_LOADER_OPTIONS, update_log_summaries, emit_log_event,
+    data_version, overlapping_records,
+)
 from metasking.model import (
-    LogReadWithRecords,
-    Record, RecordCreate, RecordRead, RecordUpdate
+    Log, LogReadWithRecords,
+    Record, RecordCreate, RecordRead, RecordBatchItem, RecordUpdate,
+    RecordTimeline,
 )
-from metasking.util import check_read_only
+from metasking.serialize import (
+    COLUMNAR_RESPONSE_CONTENT,
+    log_response,
+    timeline_response,
+    timeline_columns,
+    columns_response,
+    negotiate_format,
+    format_etag,
+)
+from metasking.util import check_read_only, not_modified
 
 
 api = APIRouter(prefix="/record", tags=["record"])
 
+# Maximum number of records read by one batch request
+BATCH_MAX_SIZE = 1000
+
+
+async def check_log_exists(session: AsyncSession, log_id: Optional[int]):
+    # Foreign keys are enforced, report a missing log instead of failing
+    if log_id is None or await session.get(Log, log_id) is None:
+        raise HTTPException(status_code=404, detail="Log not found")
+
+
+async def emit_updated_logs(session: AsyncSession, log_ids: list[int]):
+    # Record changes are updates of their logs
+    for log_id in dict.fromkeys(log_ids):
+        db_log = await session.get(Log, log_id)
+        if db_log:
+            emit_log_event(session, "update", db_log)
+
 
 @api.post(
     "/",
     response_model=RecordRead,
     responses={
         403: {"description": "Read only mode"},
+        404: {"description": "Log not found"},
     },
 )
-def create_record(
+async def create_record(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     record: RecordCreate = Body(),
 ):
     check_read_only()
+    await check_log_exists(session, record.log_id)
     db_record = Record.from_orm(record)
     session.add(db_record)
-    session.commit()
-    session.refresh(db_record)
+    await update_log_summaries(session, [db_record.log_id])
+    await emit_updated_logs(session, [db_record.log_id])
+    await session.commit()
+    await session.refresh(db_record)
     return db_record
 
 
+@api.get(
+    "/batch",
+    response_model=list[RecordBatchItem],
+    responses={
+        400: {"description": "Too many ids"},
+    },
+)
+async def read_record_batch(
+    *,
+    session: AsyncSession = Depends(use_session),
+    ids: list[int] = Query(),
+):
+    """
+    Records by ids in the order of the ids, the record of an id that
+    was not found is null
+    """
+
+    if len(ids) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail="Too many ids")
+    result = await session.exec(
+        select(Record)
+        .where(col(Record.id).in_(set(ids)))
+    )
+    db_records = {db_record.id: db_record for db_record in result.all()}
+    return [
+        {"id": record_id, "record": db_records.get(record_id)}
+        for record_id in ids
+    ]
+
+
+@api.get(
+    "/timeline",
+    response_model=RecordTimeline,
+    responses={
+        200: {"content": COLUMNAR_RESPONSE_CONTENT},
+        400: {"description": "Invalid time window"},
+    },
+)
+async def get_timeline(
+    *,
+    session: AsyncSession = Depends(use_session),
+    request: Request,
+    since: datetime,
+    until: datetime,
+):
+    """
+    Records overlapping the time window [since, until) as columns and
+    their logs (records are not clipped to the window), the logs are
+    columns too in the columnar layout (see the Accept header)
+    """
+
+    if until <= since:
+        raise HTTPException(
+            status_code=400,
+            detail="Until must be after since"
+        )
+    response_format = negotiate_format(request)
+    headers = {
+        "ETag": format_etag(data_version.etag(), response_format),
+        "Vary": "Accept",
+    }
+    if cached := not_modified(request, headers["ETag"]):
+        cached.headers["Vary"] = "Accept"
+        return cached
+
+    overlapping = overlapping_records(
+        session.bind.dialect.name,
+        since,
+        until,
+    )
+    result = await session.exec(
+        select(Record.id, Record.log_id, Record.start, Record.end)
+        .where(overlapping)
+        .order_by(col(Record.start), col(Record.id))
+    )
+    rows = result.all()
+    result_logs = await session.exec(
+        select(Log)
+        .where(col(Log.id).in_(select(Record.log_id).where(overlapping)))
+    )
+    if response_format == "json":
+        return timeline_response(rows, result_logs.all(), headers=headers)
+    return columns_response(
+        timeline_columns(rows, result_logs.all()),
+        response_format,
+        headers=headers,
+    )
+
+
 @api.get(
     "/{record_id}",
     response_model=RecordRead,
@@ -39,12 +166,12 @@ def create_record(
         404: {"description": "Record not found"},
     },
 )
-def read_record(
+async def read_record(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     record_id: int,
 ):
-    record = session.get(Record, record_id)
+    record = await session.get(Record, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
     return record
@@ -55,25 +182,32 @@ def read_record(
     response_model=RecordRead,
     responses={
         403: {"description": "Read only mode"},
-        404: {"description": "Record not found"},
+        404: {"description": "Record/Log not found"},
     },
 )
-def update_record(
+async def update_record(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     record_id: int,
     record: RecordUpdate = Body(),
 ):
     check_read_only()
-    db_record = session.get(Record, record_id)
+    db_record = await session.get(Record, record_id)
     if not db_record:
         raise HTTPException(status_code=404, detail="Record not found")
+    # The record may be moved to another log
+    log_ids = [db_record.log_id]
     record_data = record.dict(exclude_unset=True)
+    if "log_id" in record_data:
+        await check_log_exists(session, record_data["log_id"])
     for key, value in record_data.items():
         setattr(db_record, key, value)
     session.add(db_record)
-    session.commit()
-    session.refresh(db_record)
+    log_ids.append(db_record.log_id)
+    await update_log_summaries(session, log_ids)
+    await emit_updated_logs(session, log_ids)
+    await session.commit()
+    await session.refresh(db_record)
     return db_record
 
 
@@ -85,23 +219,30 @@ def update_record(
         404: {"description": "Record not found"},
     },
 )
-def delete_record(
+async def delete_record(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     record_id: int,
 ):
     check_read_only()
-    db_record = session.get(Record, record_id)
+    db_record = await session.get(Record, record_id)
     if not db_record:
         raise HTTPException(status_code=404, detail="Record not found")
-    session.delete(db_record)
+    await session.delete(db_record)
+    await session.flush()
 
     # If the log is now empty, delete it too
-    db_log = db_record.log
+    db_log = await session.get(Log, db_record.log_id)
+    assert db_log
+    await session.refresh(db_log, attribute_names=["records"])
     if not db_log.records:
-        session.delete(db_log)
+        await session.delete(db_log)
+        emit_log_event(session, "delete", db_log)
+    else:
+        await update_log_summaries(session, [db_log.id])
+        emit_log_event(session, "update", db_log)
 
-    session.commit()
+    await session.commit()
     return db_record
 
 
@@ -112,12 +253,14 @@ def delete_record(
         404: {"description": "Record not found"},
     },
 )
-def get_record_log(
+async def get_record_log(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     record_id: int,
 ):
-    record = session.get(Record, record_id)
+    record = await session.get(Record, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
-    return record.log
+    db_log = await session.get(Log, record.log_id, options=LOG_LOADER_OPTIONS)
+    assert db_log
+    return log_response(db_log)
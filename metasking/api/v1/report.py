@@ -0,0 +1,196 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import Depends, APIRouter, HTTPException, Query
+from sqlalchemy import DateTime, column, values
+from sqlmodel import select, func, col, and_, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from metasking.db import use_session
+from metasking.db.functions import duration_seconds, greatest, least
+from metasking.model import (
+    Log,
+    Record,
+    Task,
+    Category,
+    LogFlag,
+    Report,
+    ReportEntry,
+)
+from metasking.util import RequestTime
+
+
+api = APIRouter(prefix="/report", tags=["report"])
+
+GROUPS = ("category", "task", "flag", "log")
+
+# Upper bound of the number of day/week/month buckets in one report
+MAX_BUCKETS = 1000
+
+
+def truncate_time(time: datetime, bucket: str) -> datetime:
+    """
+    Start of the day/week/month containing the given time
+    (weeks start on Monday)
+    """
+
+    day = time.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown bucket {bucket}")
+
+
+def next_bucket(start: datetime, bucket: str) -> datetime:
+    if bucket == "day":
+        return start + timedelta(days=1)
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        if start.month == 12:
+            return start.replace(year=start.year + 1, month=1)
+        return start.replace(month=start.month + 1)
+    raise ValueError(f"Unknown bucket {bucket}")
+
+
+def bucket_bounds(
+    since: datetime,
+    until: datetime,
+    bucket: Optional[str],
+) -> list[tuple[datetime, datetime, datetime]]:
+    """
+    (bucket start, clipped start, clipped end) of every bucket
+    overlapping the window, a single bucket if no bucketing is requested
+    """
+
+    if bucket is None:
+        return [(since, since, until)]
+
+    bounds = []
+    start = truncate_time(since, bucket)
+    while start < until:
+        end = next_bucket(start, bucket)
+        bounds.append((start, max(start, since), min(end, until)))
+        if len(bounds) > MAX_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many buckets (at most {MAX_BUCKETS})"
+            )
+        start = end
+    return bounds
+
+
+@api.get(
+    "/",
+    response_model=Report,
+    responses={
+        400: {"description": "Invalid time window or grouping"},
+    },
+)
+async def get_report(
+    *,
+    session: AsyncSession = Depends(use_session),
+    request_time: RequestTime,
+    since: datetime,
+    until: Optional[datetime] = None,
+    group_by: list[str] = Query([]),
+    bucket: Optional[str] = Query(None, regex="^(day|week|month)$"),
+    category_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    flags: Optional[list[str]] = Query(None),
+):
+    """
+    Tracked time in the window (since, until) grouped by the requested
+    keys. Records are clipped to the window (and to the buckets),
+    running records end at the request time.
+    NOTE: grouping by flag counts time of a log once for every its flag
+    """
+
+    if until is None:
+        until = request_time
+    if since >= until:
+        raise HTTPException(
+            status_code=400,
+            detail="since must be before until"
+        )
+    for group in group_by:
+        if group not in GROUPS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot group by {group}, use one of " +
+                ", ".join(GROUPS)
+            )
+
+    bounds = bucket_bounds(since, until, bucket)
+    buckets = values(
+        column("bucket", DateTime),
+        column("start", DateTime),
+        column("end", DateTime),
+    ).data(bounds).cte("buckets")
+
+    # Clip records to the bucket (buckets are already clipped to the window)
+    record_end = func.coalesce(col(Record.end), request_time)
+    clipped_start = greatest(col(Record.start), buckets.c.start)
+    clipped_end = least(record_end, buckets.c.end)
+    duration = func.sum(duration_seconds(clipped_start, clipped_end))
+
+    keys = []
+    if bucket is not None:
+        keys.append(buckets.c.bucket.label("bucket"))
+    if "category" in group_by:
+        keys.append(col(Log.category_id).label("category_id"))
+        keys.append(col(Category.name).label("category"))
+    if "task" in group_by:
+        keys.append(col(Log.task_id).label("task_id"))
+        keys.append(col(Task.name).label("task"))
+    if "flag" in group_by:
+        keys.append(col(LogFlag.flag).label("flag"))
+    if "log" in group_by:
+        keys.append(col(Log.id).label("log_id"))
+        keys.append(col(Log.name).label("log_name"))
+
+    selector = select(*keys, duration.label("duration")) \
+        .select_from(Record) \
+        .join(buckets, and_(
+            col(Record.start) < buckets.c.end,
+            record_end > buckets.c.start,
+        )) \
+        .join(Log, col(Log.id) == col(Record.log_id)) \
+        .where(col(Record.start) < until) \
+        .where(or_(col(Record.end).is_(None), col(Record.end) > since))
+    if "category" in group_by:
+        selector = selector.outerjoin(
+            Category,
+            col(Category.id) == col(Log.category_id),
+        )
+    if "task" in group_by:
+        selector = selector.outerjoin(Task, col(Task.id) == col(Log.task_id))
+    if "flag" in group_by:
+        selector = selector.outerjoin(
+            LogFlag,
+            col(LogFlag.log_id) == col(Log.id),
+        )
+
+    if category_id is not None:
+        selector = selector.where(Log.category_id == category_id)
+    if task_id is not None:
+        selector = selector.where(Log.task_id == task_id)
+    if flags is not None:
+        selector = selector.where(col(Log.id).in_(
+            select(LogFlag.log_id)
+            .where(col(LogFlag.flag).in_(flags))
+        ))
+
+    if keys:
+        selector = selector.group_by(*keys).order_by(*keys)
+
+    result = await session.execute(selector)
+    entries = [
+        ReportEntry(**row._mapping)
+        for row in result
+        if row.duration is not None
+    ]
+    return Report(since=since, until=until, entries=entries)
@@ -1,33 +1,50 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import Depends, APIRouter, HTTPException, Query, Body
-from sqlmodel import Session, select
+from fastapi import (
+    Depends,
+    APIRouter,
+    HTTPException,
+    Query,
+    Body,
+    Request,
+    Response,
+)
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from metasking.db import use_session
+from metasking.db import use_session, data_version
 from metasking.model import (
     LogRead,
     Task, TaskCreate, TaskRead, TaskUpdate,
 )
-from metasking.util import check_read_only
+from metasking.serialize import log_reads_response
+from metasking.util import check_read_only, not_modified
 
-from .log import get_logs
+from .log import query_logs
 
 
 api = APIRouter(prefix="/task", tags=["task"])
 
 
 @api.get("/list", response_model=list[TaskRead])
-def get_tasks(
+async def get_tasks(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
+    request: Request,
+    response: Response,
     offset: int = 0,
     limit: int = Query(100, lte=1000),
 ):
+    etag = data_version.etag()
+    if cached := not_modified(request, etag):
+        return cached
+    response.headers["ETag"] = etag
+
     selector = select(Task) \
         .offset(offset) \
         .limit(limit)
-    result = session.exec(selector)
+    result = await session.exec(selector)
     tasks = result.all()
     return tasks
 
@@ -39,16 +56,16 @@ def get_tasks(
         403: {"description": "Read only mode"},
     },
 )
-def create_task(
+async def create_task(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     task: TaskCreate = Body(),
 ):
     check_read_only()
     db_task = Task.from_orm(task)
     session.add(db_task)
-    session.commit()
-    session.refresh(db_task)
+    await session.commit()
+    await session.refresh(db_task)
     return db_task
 
 
@@ -59,12 +76,12 @@ def create_task(
         404: {"description": "Task not found"},
     }
 )
-def read_task(
+async def read_task(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     task_id: int,
 ):
-    task = session.get(Task, task_id)
+    task = await session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
@@ -78,22 +95,22 @@ def read_task(
         404: {"description": "Task not found"},
     },
 )
-def update_task(
+async def update_task(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     task_id: int,
     task: TaskUpdate = Body(),
 ):
     check_read_only()
-    db_task = session.get(Task, task_id)
+    db_task = await session.get(Task, task_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
     task_data = task.dict(exclude_unset=True)
     for key, value in task_data.items():
         setattr(db_task, key, value)
     session.add(db_task)
-    session.commit()
-    session.refresh(db_task)
+    await session.commit()
+    await session.refresh(db_task)
     return db_task
 
 
@@ -105,17 +122,17 @@ def update_task(
         404: {"description": "Task not found"},
     },
 )
-def delete_task(
+async def delete_task(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
     task_id: int,
 ):
     check_read_only()
-    db_task = session.get(Task, task_id)
+    db_task = await session.get(Task, task_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
-    session.delete(db_task)
-    session.commit()
+    await session.delete(db_task)
+    await session.commit()
     return db_task
 
 
@@ -124,26 +141,38 @@ def delete_task(
     response_model=list[LogRead],
     responses={
         404: {"description": "Task not found"},
+        400: {"description": "Invalid cursor"},
     }
 )
-def get_task_logs(
+async def get_task_logs(
     *,
-    session: Session = Depends(use_session),
+    session: AsyncSession = Depends(use_session),
+    response: Response,
     task_id: int,
     offset: int = 0,
     limit: int = Query(100, lte=1000),
+    cursor: Optional[str] = None,
     stopped: Optional[bool] = None,
     order: str = Query("desc", regex="^(asc|desc)$"),
     since: Optional[datetime] = None,
     until: Optional[datetime] = None,
 ):
-    return get_logs(
+    db_logs = await query_logs(
         session=session,
+        response=response,
         offset=offset,
         limit=limit,
+        cursor=cursor,
         task_id=task_id,
+        category_id=None,
+        category=None,
+        task=None,
+        description=None,
         stopped=stopped,
+        flags=None,
         order=order,
         since=since,
         until=until,
+        load_relationships=False,
     )
+    return log_reads_response(db_logs, headers=response.headers)
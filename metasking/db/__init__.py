@@ -1,19 +1,77 @@
-from .db import use_session
+from .db import use_session, slow_query_log
 from .queries import (
+    LOG_LOADER_OPTIONS,
+    SINGLE_LOG_LOADER_OPTIONS,
+    select_logs,
+    refresh_logs,
+    refresh_log,
+    update_log_summaries,
+    close_open_records,
     pause_all_logs,
     resume_last_paused_log,
+    split_logs_at,
+    merge_logs_into,
     get_log_by_dynamic_id,
+    get_logs_by_dynamic_ids,
+    LogDetailRows,
+    get_log_detail_rows,
+    find_active_record,
+    get_active_record,
     select_active_record,
     select_non_stopped_logs,
+    find_name_id,
+    name_id_exists,
     apply_log_create,
+    resolve_names,
+    check_ids_exist,
+    insert_logs,
 )
+from .search import search_fulltext
+from .interval import overlapping_records
+from .active import ACTIVE_RECORD_CACHE, ActiveRecord, active_record_cache
+from .version import data_version
+from .names import NAME_CACHE_SIZE, NameCache, name_caches
+from .events import event_broker, emit_log_event
+from .slow import current_scope
 
 __all__ = [
     "use_session",
+    "slow_query_log",
+    "LOG_LOADER_OPTIONS",
+    "SINGLE_LOG_LOADER_OPTIONS",
+    "select_logs",
+    "refresh_logs",
+    "refresh_log",
+    "update_log_summaries",
+    "close_open_records",
     "pause_all_logs",
     "resume_last_paused_log",
+    "split_logs_at",
+    "merge_logs_into",
     "get_log_by_dynamic_id",
+    "get_logs_by_dynamic_ids",
+    "LogDetailRows",
+    "get_log_detail_rows",
+    "find_active_record",
+    "get_active_record",
     "select_active_record",
     "select_non_stopped_logs",
+    "find_name_id",
+    "name_id_exists",
     "apply_log_create",
+    "resolve_names",
+    "check_ids_exist",
+    "insert_logs",
+    "search_fulltext",
+    "overlapping_records",
+    "ACTIVE_RECORD_CACHE",
+    "ActiveRecord",
+    "active_record_cache",
+    "data_version",
+    "NAME_CACHE_SIZE",
+    "NameCache",
+    "name_caches",
+    "event_broker",
+    "emit_log_event",
+    "current_scope",
 ]
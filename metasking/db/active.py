@@ -0,0 +1,159 @@
+import os
+from typing import Any, NamedTuple, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, SessionTransaction
+from sqlmodel.orm.session import Session
+
+from metasking.model import Record
+
+
+# on - use the cache
+# off - always query the database
+# validate - use the cache and cross-check it against the database
+ACTIVE_RECORD_CACHE = os.environ.get("ACTIVE_RECORD_CACHE", "on").lower()
+if ACTIVE_RECORD_CACHE not in ("on", "off", "validate"):
+    raise ValueError(
+        "ACTIVE_RECORD_CACHE environment variable must be one of " +
+        "on, off, validate"
+    )
+
+
+class ActiveRecord(NamedTuple):
+    record_id: int
+    log_id: int
+
+
+class Unknown:
+    pass
+
+
+UNKNOWN = Unknown()
+
+ActiveRecordState = Union[Optional[ActiveRecord], Unknown]
+
+
+class ActiveRecordCache:
+    """
+    Process-local cache of the active record (record without end)
+
+    A known state is the complete set of open records (none or a single
+    one), with more open records the state is UNKNOWN. The cache is
+    updated from the record changes of committed sessions (write-through),
+    any change it cannot follow resets it to UNKNOWN and the next lookup
+    loads it from the database again.
+    NOTE: only valid as long as a single process writes to the database
+    """
+
+    def __init__(self):
+        self.state: ActiveRecordState = UNKNOWN
+        # Bumped on every change so that a lookup racing with a commit
+        # does not store an outdated state
+        self.generation = 0
+
+    def store(self, state: Optional[ActiveRecord], generation: int):
+        if generation == self.generation:
+            self.state = state
+
+    def invalidate(self):
+        self.generation += 1
+        self.state = UNKNOWN
+
+    def apply(self, changes: list[tuple[str, Any]]):
+        """
+        Apply record changes of a committed session in order
+        """
+
+        self.generation += 1
+        state = self.state
+        for change, value in changes:
+            if change == "unknown":
+                state = UNKNOWN
+            elif change == "close":
+                if isinstance(state, ActiveRecord) and \
+                        state.record_id == value:
+                    state = None
+            elif change == "close_open":
+                # All open records (of the given logs) were closed
+                if value is None or (
+                    isinstance(state, ActiveRecord) and
+                    state.log_id in value
+                ):
+                    state = None
+            elif change == "open":
+                if state is None or (
+                    isinstance(state, ActiveRecord) and
+                    state.record_id == value.record_id
+                ):
+                    state = value
+                else:
+                    # Either unknown already or more than one open record
+                    state = UNKNOWN
+        self.state = state
+
+
+active_record_cache = ActiveRecordCache()
+
+
+# Track record changes of every session, apply them on commit
+
+def _pending_changes(session: Session) -> list[tuple[str, Any]]:
+    return session.info.setdefault("active_record_changes", [])
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_records(session: Session, flush_context: Any):
+    changes = _pending_changes(session)
+    for obj in session.deleted:
+        if isinstance(obj, Record):
+            changes.append(("close", obj.id))
+    for obj in session.dirty:
+        if isinstance(obj, Record) and obj.end is not None:
+            changes.append(("close", obj.id))
+    for obj in [*session.dirty, *session.new]:
+        if isinstance(obj, Record) and obj.end is None:
+            assert obj.id is not None and obj.log_id is not None
+            changes.append(("open", ActiveRecord(obj.id, obj.log_id)))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statements(orm_execute_state: ORMExecuteState):
+    # Statements executed without the unit of work (bulk insert, update...)
+    if not (
+        orm_execute_state.is_insert or
+        orm_execute_state.is_update or
+        orm_execute_state.is_delete
+    ):
+        return
+    mappers = orm_execute_state.all_mappers
+    # Core statements on the table have no mappers
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is Record.__table__ or \
+            any(mapper.class_ is Record for mapper in mappers):
+        changes = _pending_changes(orm_execute_state.session)
+        options = orm_execute_state.execution_options
+        if "closes_open_records" in options:
+            # See close_open_records (None - of all logs)
+            changes.append(("close_open", options["closes_open_records"]))
+        else:
+            # Affected records are unknown
+            changes.append(("unknown", None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_records(session: Session):
+    changes = session.info.pop("active_record_changes", None)
+    if changes:
+        active_record_cache.apply(changes)
+
+
+# Not after_begin - the first statement of a transaction is seen by
+# do_orm_execute before the transaction begins
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending_records(
+    session: Session,
+    transaction: SessionTransaction,
+):
+    # Committed changes are already applied, drop the rolled back ones
+    if transaction.parent is None:
+        session.info.pop("active_record_changes", None)
@@ -0,0 +1,144 @@
+import os
+from typing import Any, Optional
+
+from sqlalchemy.engine import URL
+
+
+# Engine configuration from environment variables, unset variables
+# fall back to the defaults of the database dialect
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("true", "1", "yes", "y", "on")
+
+
+def env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(
+            f"{name} environment variable must be an integer"
+        ) from None
+
+
+def env_choice(name: str, default: str, choices: tuple[str, ...]) -> str:
+    value = os.environ.get(name, default).lower()
+    if value not in choices:
+        raise ValueError(
+            f"{name} environment variable must be one of " +
+            ", ".join(choices)
+        )
+    return value
+
+
+# Log every statement (very verbose, for debugging only)
+DATABASE_ECHO = env_bool("DATABASE_ECHO", False)
+
+# Connection pool, defaults per dialect (see POOL_DEFAULTS)
+DATABASE_POOL_SIZE = env_int("DATABASE_POOL_SIZE", None)
+DATABASE_MAX_OVERFLOW = env_int("DATABASE_MAX_OVERFLOW", None)
+# Seconds after which a connection is replaced (-1 never)
+DATABASE_POOL_RECYCLE = env_int("DATABASE_POOL_RECYCLE", None)
+
+# SQLite connection pragmas
+# WAL with synchronous=NORMAL only syncs at checkpoints, a commit is a
+# single append to the log (durable against application crashes, the
+# last transactions may be lost on power failure)
+SQLITE_JOURNAL_MODE = env_choice(
+    "SQLITE_JOURNAL_MODE",
+    "wal",
+    ("delete", "truncate", "persist", "memory", "wal", "off"),
+)
+SQLITE_SYNCHRONOUS = env_choice(
+    "SQLITE_SYNCHRONOUS",
+    "normal",
+    ("off", "normal", "full", "extra"),
+)
+# Bytes of the database file read through memory mapping
+SQLITE_MMAP_SIZE = env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+# Page cache per connection, negative values are in KiB
+SQLITE_CACHE_SIZE = env_int("SQLITE_CACHE_SIZE", -64 * 1024)
+# Milliseconds to wait for a lock held by another connection
+SQLITE_BUSY_TIMEOUT = env_int("SQLITE_BUSY_TIMEOUT", 5000)
+SQLITE_FOREIGN_KEYS = env_bool("SQLITE_FOREIGN_KEYS", True)
+
+# Statements running longer than the threshold (milliseconds) are logged
+# with their query plan, negative value disables the slow query log
+SLOW_QUERY_THRESHOLD = env_int("SLOW_QUERY_THRESHOLD", 100)
+# Number of recent slow queries kept in memory
+SLOW_QUERY_LOG_SIZE = env_int("SLOW_QUERY_LOG_SIZE", 100)
+SLOW_QUERY_EXPLAIN = env_bool("SLOW_QUERY_EXPLAIN", True)
+
+POOL_DEFAULTS: dict[str, dict[str, int]] = {
+    # Connections to a file are cheap, WAL allows concurrent readers
+    # next to the single writer
+    "sqlite": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_recycle": -1,
+    },
+    # Recycle before typical server/proxy idle timeouts
+    "postgresql": {
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_recycle": 1800,
+    },
+}
+
+
+def is_memory_database(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and \
+        url.database in (None, "", ":memory:")
+
+
+def get_engine_options(url: URL) -> dict[str, Any]:
+    """
+    Keyword arguments of create_async_engine for the database
+    """
+
+    options: dict[str, Any] = {"echo": DATABASE_ECHO}
+
+    # In-memory SQLite uses a single static connection without pooling
+    if is_memory_database(url):
+        return options
+
+    defaults = POOL_DEFAULTS.get(url.get_backend_name(), {})
+    configured = {
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_recycle": DATABASE_POOL_RECYCLE,
+    }
+    for key, value in configured.items():
+        if value is None:
+            value = defaults.get(key)
+        if value is not None:
+            options[key] = value
+    if url.get_backend_name() == "postgresql":
+        # Detect connections closed by the server
+        options["pool_pre_ping"] = True
+    return options
+
+
+def get_sqlite_pragmas(url: URL) -> list[str]:
+    """
+    Statements executed on every new SQLite connection
+    """
+
+    pragmas = []
+    if not is_memory_database(url):
+        # Persistent in the database file, no effect in memory
+        pragmas.append(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        pragmas.append(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    pragmas += [
+        f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT}",
+        "PRAGMA foreign_keys = " + ("ON" if SQLITE_FOREIGN_KEYS else "OFF"),
+    ]
+    return pragmas
@@ -1,39 +1,78 @@
 import os
-# from typing import AsyncGenerator
-from typing import Generator
+from typing import AsyncGenerator
 
-from sqlmodel import create_engine, Session
-# from sqlmodel.ext.asyncio.session import (
-#     AsyncEngine  # type: ignore
-# )
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-# from sqlalchemy.orm import sessionmaker
-
-# from metasking.asyncsessionfix import AsyncSession
+from .config import (
+    SLOW_QUERY_THRESHOLD,
+    SLOW_QUERY_LOG_SIZE,
+    SLOW_QUERY_EXPLAIN,
+    get_engine_options,
+    get_sqlite_pragmas,
+)
+from .slow import SlowQueryLog
 
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL environment variable is not set")
 
-# engine = AsyncEngine(create_engine(
-#     DATABASE_URL, echo=True, future=True,
-#     connect_args={"check_same_thread": False}
-# ))
-engine = create_engine(
-    DATABASE_URL, echo=True, future=True,
-    # connect_args={"check_same_thread": False}
+# Map synchronous drivers (used by alembic) to their asyncio counterparts
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    parsed_url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(
+        parsed_url.drivername,
+        parsed_url.drivername
+    )
+    return parsed_url.set(drivername=drivername) \
+        .render_as_string(hide_password=False)
+
+
+async_database_url = make_url(get_async_database_url(DATABASE_URL))
+
+engine = create_async_engine(
+    async_database_url,
+    future=True,
+    **get_engine_options(async_database_url),
 )
 
+if async_database_url.get_backend_name() == "sqlite":
+    SQLITE_PRAGMAS = get_sqlite_pragmas(async_database_url)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
 
-# async def use_session() -> AsyncGenerator[AsyncSession, None]:
-#     async_session = sessionmaker(
-#         engine, class_=AsyncSession, expire_on_commit=False
-#     )
-#     async with async_session() as session:
-#         yield session
+slow_query_log = SlowQueryLog(
+    SLOW_QUERY_THRESHOLD or 0,
+    SLOW_QUERY_LOG_SIZE or 0,
+    SLOW_QUERY_EXPLAIN,
+)
+if SLOW_QUERY_THRESHOLD is not None and SLOW_QUERY_THRESHOLD >= 0:
+    slow_query_log.register(engine.sync_engine)
+
+async_session = sessionmaker(
+    engine,  # type: ignore
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
 
-def use_session() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+async def use_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session() as session:
         yield session
@@ -0,0 +1,165 @@
+import asyncio
+import secrets
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.orm.session import Session
+
+from metasking.db.config import env_int
+from metasking.model import Log, LogEvent
+
+
+# Number of recent events a reconnecting client can catch up on
+EVENT_HISTORY_SIZE = env_int("EVENT_HISTORY_SIZE", 1000) or 0
+# Events waiting for a slow client before it is disconnected
+EVENT_QUEUE_SIZE = env_int("EVENT_QUEUE_SIZE", 1000) or 0
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue[LogEvent] = asyncio.Queue(queue_size)
+        # The client did not keep up and missed events
+        self.overflowed = False
+
+
+class EventBroker:
+    """
+    Broadcast events of committed log changes to the connected clients
+
+    Recent events are kept so that a client can resume after reconnecting.
+    Event ids are prefixed by a random per-process epoch (see stream_id),
+    ids of another process (or of a previous run) trigger a reset event.
+    NOTE: only sees the changes made by this process
+    """
+
+    def __init__(self, history_size: int, queue_size: int):
+        self.epoch = secrets.token_hex(4)
+        self.last_id = 0
+        self.history: deque[LogEvent] = deque(maxlen=history_size)
+        self.queue_size = queue_size
+        self.subscriptions: set[Subscription] = set()
+
+    def stream_id(self, event_id: int) -> str:
+        return f"{self.epoch}-{event_id}"
+
+    def parse_stream_id(self, stream_id: str) -> Optional[int]:
+        epoch, _, event_id = stream_id.partition("-")
+        if epoch != self.epoch or not event_id.isdigit():
+            return None
+        return int(event_id)
+
+    def publish(self, events: list[dict[str, Any]]):
+        for data in events:
+            self.last_id += 1
+            log_event = LogEvent(id=self.last_id, **data)
+            self.history.append(log_event)
+            for subscription in list(self.subscriptions):
+                try:
+                    subscription.queue.put_nowait(log_event)
+                except asyncio.QueueFull:
+                    subscription.overflowed = True
+                    self.subscriptions.discard(subscription)
+
+    def replay(self, last_event_id: Optional[str]) -> list[LogEvent]:
+        """
+        Events following the given (stream) id, a reset event when some
+        of them are not available anymore
+        """
+
+        if last_event_id is None:
+            return []
+        event_id = self.parse_stream_id(last_event_id)
+        if event_id is None or event_id > self.last_id or (
+            self.history and event_id < self.history[0].id - 1
+        ) or (not self.history and event_id < self.last_id):
+            return [self.reset()]
+        return [e for e in self.history if e.id > event_id]
+
+    def reset(self) -> LogEvent:
+        # Sent with the id of the last event, continuing from it is safe
+        # once the client reloaded the state
+        return LogEvent(id=self.last_id, type="reset", time=datetime.now())
+
+    async def subscribe(
+        self,
+        last_event_id: Optional[str],
+        keepalive: float,
+    ) -> AsyncIterator[Optional[LogEvent]]:
+        """
+        Replayed and then live events, None when there was no event
+        for `keepalive` seconds
+        """
+
+        subscription = Subscription(self.queue_size)
+        # Registered before the replay (without awaiting in between),
+        # so that no event is lost or sent twice
+        self.subscriptions.add(subscription)
+        try:
+            replayed = self.replay(last_event_id)
+            last_id = replayed[-1].id if replayed else self.last_id
+            for log_event in replayed:
+                yield log_event
+            while True:
+                if subscription.overflowed and subscription.queue.empty():
+                    # The client reconnects and catches up from the history
+                    return
+                try:
+                    log_event = await asyncio.wait_for(
+                        subscription.queue.get(),
+                        keepalive,
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if log_event.id > last_id:
+                    last_id = log_event.id
+                    yield log_event
+        finally:
+            self.subscriptions.discard(subscription)
+
+
+event_broker = EventBroker(EVENT_HISTORY_SIZE, EVENT_QUEUE_SIZE)
+
+
+# Events are collected by the session and published once it commits
+
+def emit_log_event(
+    session: AsyncSession,
+    event_type: str,
+    db_log: Log,
+    related_log: Optional[Log] = None,
+):
+    """
+    Publish the event when the session commits (dropped on rollback),
+    ids of new logs are resolved at that time
+    """
+
+    session.info.setdefault("log_events", []).append(
+        (event_type, datetime.now(), db_log, related_log)
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session: Session):
+    pending = session.info.pop("log_events", None)
+    if not pending:
+        return
+    event_broker.publish([
+        {
+            "type": event_type,
+            "time": time,
+            "log_id": db_log.id,
+            "related_log_id": related_log.id if related_log else None,
+            "task_id": db_log.task_id,
+            "category_id": db_log.category_id,
+        }
+        for event_type, time, db_log, related_log in pending
+    ])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session: Session):
+    session.info.pop("log_events", None)
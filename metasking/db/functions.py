@@ -0,0 +1,76 @@
+from typing import Any
+
+from sqlalchemy import Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement, ReturnTypeFromArgs
+
+
+class duration_seconds(FunctionElement):
+    """
+    Number of seconds between two datetimes (end - start)
+    """
+
+    type = Float()
+    name = "duration_seconds"
+    inherit_cache = True
+
+
+@compiles(duration_seconds)
+def _compile_duration_seconds(
+    element: duration_seconds,
+    compiler: Any,
+    **kw: Any,
+) -> str:
+    start, end = list(element.clauses)
+    return "EXTRACT(EPOCH FROM (%s - %s))" % (
+        compiler.process(end, **kw),
+        compiler.process(start, **kw),
+    )
+
+
+@compiles(duration_seconds, "sqlite")
+def _compile_duration_seconds_sqlite(
+    element: duration_seconds,
+    compiler: Any,
+    **kw: Any,
+) -> str:
+    # julianday() is a float day number, round off the representation error
+    start, end = list(element.clauses)
+    return "ROUND((julianday(%s) - julianday(%s)) * 86400.0, 3)" % (
+        compiler.process(end, **kw),
+        compiler.process(start, **kw),
+    )
+
+
+class greatest(ReturnTypeFromArgs):
+    """
+    Largest of the arguments (GREATEST, scalar max() on SQLite)
+    """
+
+    inherit_cache = True
+
+
+class least(ReturnTypeFromArgs):
+    """
+    Smallest of the arguments (LEAST, scalar min() on SQLite)
+    """
+
+    inherit_cache = True
+
+
+@compiles(greatest, "sqlite")
+def _compile_greatest_sqlite(
+    element: greatest,
+    compiler: Any,
+    **kw: Any,
+) -> str:
+    return "max(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(least, "sqlite")
+def _compile_least_sqlite(
+    element: least,
+    compiler: Any,
+    **kw: Any,
+) -> str:
+    return "min(%s)" % compiler.process(element.clauses, **kw)
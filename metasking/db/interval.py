@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    cast,
+    column,
+    literal_column,
+    table,
+)
+from sqlmodel import select, func, col, and_, or_
+
+from metasking.model import Record
+
+
+# Index maintained by the database (see the record interval migration):
+# SQLite - R*Tree record_interval (whole minutes) synchronized by triggers
+# PostgreSQL - GiST index of tsrange(record.start, record.end, '[]')
+# (inclusive, a zero-length record is an empty range with default bounds)
+
+record_interval = table(
+    "record_interval",
+    column("id"),
+    column("lo"),
+    column("hi"),
+)
+
+
+def epoch_minutes(value) -> ColumnElement:
+    # Same rounding down as the triggers of record_interval
+    return cast(func.strftime("%s", value), Integer) // 60
+
+
+def overlapping_records(
+    dialect: str,
+    since: datetime,
+    until: datetime,
+) -> ColumnElement[bool]:
+    """
+    Condition matching the records overlapping [since, until)
+    (running records last forever)
+    """
+
+    overlapping = and_(
+        col(Record.start) < until,
+        or_(col(Record.end) > since, col(Record.end).is_(None)),
+    )
+
+    if dialect == "sqlite":
+        # The index is coarser (minutes), the exact condition still applies
+        candidates = select(record_interval.c.id) \
+            .where(record_interval.c.lo <= epoch_minutes(until)) \
+            .where(record_interval.c.hi >= epoch_minutes(since))
+        return and_(col(Record.id).in_(candidates), overlapping)
+
+    if dialect == "postgresql":
+        # Same expression as the index (the bounds are a literal, a bound
+        # parameter would not match it in generic plans)
+        intervals = func.tsrange(
+            col(Record.start),
+            col(Record.end),
+            literal_column("'[]'"),
+        )
+        return and_(
+            intervals.op("&&")(func.tsrange(since, until)),
+            overlapping,
+        )
+
+    return overlapping
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, SessionTransaction
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.orm.session import Session
+
+from metasking.db.config import env_int
+from metasking.model import Task, Category
+
+
+# Number of names remembered per model (0 disables the cache)
+NAME_CACHE_SIZE = env_int("NAME_CACHE_SIZE", 1000) or 0
+
+
+class NameCache:
+    """
+    Process-local cache of task or category names and ids (both ways)
+
+    Entries are stored after a lookup, any change of the model clears
+    the cache when its transaction ends, the least recently used entries
+    are evicted when it is full.
+    NOTE: only valid as long as a single process writes to the database
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ids: OrderedDict[str, int] = OrderedDict()
+        self.names: dict[int, str] = {}
+        # Bumped on every change so that a lookup racing with a commit
+        # does not store an outdated entry
+        self.generation = 0
+
+    def get_id(self, name: str) -> Optional[int]:
+        model_id = self.ids.get(name)
+        if model_id is not None:
+            self.ids.move_to_end(name)
+        return model_id
+
+    def get_name(self, model_id: int) -> Optional[str]:
+        name = self.names.get(model_id)
+        if name is not None:
+            self.ids.move_to_end(name)
+        return name
+
+    def store(self, model_id: int, name: str, generation: int):
+        if generation != self.generation or self.size <= 0:
+            return
+        self.ids[name] = model_id
+        self.ids.move_to_end(name)
+        self.names[model_id] = name
+        while len(self.ids) > self.size:
+            _, evicted = self.ids.popitem(last=False)
+            self.names.pop(evicted, None)
+
+    def invalidate(self):
+        self.generation += 1
+        self.ids.clear()
+        self.names.clear()
+
+
+NamedModel = Union[type[Task], type[Category]]
+
+name_caches: dict[NamedModel, NameCache] = {
+    Task: NameCache(NAME_CACHE_SIZE),
+    Category: NameCache(NAME_CACHE_SIZE),
+}
+
+
+def get_name_cache(
+    session: AsyncSession,
+    model: NamedModel,
+) -> Optional[NameCache]:
+    """
+    Name cache of the model, None when the session has uncommitted
+    changes of the model (the cache does not know about them)
+    """
+
+    if model in session.info.get("name_cache_models", ()):
+        return None
+    return name_caches[model]
+
+
+# Track task/category changes of every session, clear the caches
+# at the end of the transaction
+
+def _pending_models(session: Session) -> set[Any]:
+    return session.info.setdefault("name_cache_models", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_names(session: Session, flush_context: Any):
+    pending = _pending_models(session)
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        if isinstance(obj, (Task, Category)):
+            pending.add(type(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_names(orm_execute_state: ORMExecuteState):
+    # Statements executed without the unit of work (see resolve_names)
+    if not (
+        orm_execute_state.is_insert or
+        orm_execute_state.is_update or
+        orm_execute_state.is_delete
+    ):
+        return
+    mappers = orm_execute_state.all_mappers
+    # Core statements on the table have no mappers
+    table = getattr(orm_execute_state.statement, "table", None)
+    for model in name_caches:
+        if table is model.__table__ or \
+                any(mapper.class_ is model for mapper in mappers):
+            _pending_models(orm_execute_state.session).add(model)
+
+
+# Committed and rolled back transactions alike (clearing is cheap and
+# the tables rarely change)
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_changed_names(
+    session: Session,
+    transaction: SessionTransaction,
+):
+    if transaction.parent is None:
+        for model in session.info.pop("name_cache_models", ()):
+            name_caches[model].invalidate()
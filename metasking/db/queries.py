@@ -1,88 +1,509 @@
-from typing import Optional
+from typing import (
+    Any,
+    Collection,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
 from datetime import datetime
 
 from fastapi import HTTPException
-from sqlmodel import Session, select, func, col
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import (
+    select,
+    insert,
+    update,
+    delete,
+    func,
+    col,
+    case,
+    exists,
+    literal,
+    or_,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import SelectOfScalar
 
 from metasking.logger import logger
+from metasking.db.functions import duration_seconds
+from metasking.db.events import emit_log_event
+from metasking.db.active import (
+    ACTIVE_RECORD_CACHE,
+    ActiveRecord,
+    Unknown,
+    active_record_cache,
+)
+from metasking.db.names import NamedModel, get_name_cache
 from metasking.model import (
     Task,
     Category,
     Log,
     LogCreate,
+    LogImport,
     Record,
     LogFlag,
 )
 
 
-def pause_all_logs(session: Session, request_time: datetime):
-    selector = select(Record) \
+# Eagerly load everything needed to serialize LogReadWithRecords
+# Select-in loading keeps the query count constant regardless of the number
+# of returned logs and (unlike joined loading) works with grouped selects
+LOG_LOADER_OPTIONS = (
+    selectinload(Log.task),  # type: ignore
+    selectinload(Log.category),  # type: ignore
+    selectinload(Log.flags),  # type: ignore
+    selectinload(Log.records),  # type: ignore
+)
+
+# Same for a single log looked up by its primary key, the task and category
+# are joined into the lookup (joining the flags and records as well would
+# return flags x records rows)
+SINGLE_LOG_LOADER_OPTIONS = (
+    joinedload(Log.task),  # type: ignore
+    joinedload(Log.category),  # type: ignore
+    selectinload(Log.flags),  # type: ignore
+    selectinload(Log.records),  # type: ignore
+)
+
+
+def select_logs() -> SelectOfScalar[Log]:
+    return select(Log).options(*LOG_LOADER_OPTIONS)
+
+
+async def refresh_logs(
+    session: AsyncSession,
+    db_logs: Sequence[Log],
+) -> list[Log]:
+    """
+    Reload the logs (including relationships) after they were modified
+    """
+
+    if not db_logs:
+        return []
+    selector = select_logs() \
+        .where(col(Log.id).in_([db_log.id for db_log in db_logs])) \
+        .execution_options(populate_existing=True)
+    result = await session.exec(selector)
+    result.all()
+    return list(db_logs)
+
+
+async def refresh_log(session: AsyncSession, db_log: Log) -> Log:
+    await refresh_logs(session, [db_log])
+    return db_log
+
+
+async def update_log_summaries(
+    session: AsyncSession,
+    log_ids: Iterable[Optional[int]],
+):
+    """
+    Recompute the stored record summary (LogSummary) of the given logs
+
+    Has to be called by every operation that changes records of a log.
+    NOTE: logs already loaded in the session are not updated,
+    use refresh_logs to reload them
+    """
+
+    ids = {log_id for log_id in log_ids if log_id is not None}
+    if not ids:
+        return
+
+    # Make sure pending record changes are visible to the update
+    await session.flush()
+
+    log_records = col(Record.log_id) == col(Log.id)
+    open_records = exists() \
+        .where(log_records) \
         .where(col(Record.end).is_(None))
-    result = session.exec(selector)
-    for db_record in result:
-        if db_record.start > request_time:
-            # Someone has shifted the time too much :D
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    "Cannot pause a record that has not " +
-                    "started yet (start is in the future)"
-                )
+    statement = update(Log) \
+        .where(col(Log.id).in_(ids)) \
+        .values(
+            start=select(func.min(col(Record.start)))
+            .where(log_records)
+            .scalar_subquery(),
+            last_start=select(func.max(col(Record.start)))
+            .where(log_records)
+            .scalar_subquery(),
+            end=case(
+                (open_records, None),
+                else_=select(func.max(col(Record.end)))
+                .where(log_records)
+                .scalar_subquery(),
+            ),
+            active=open_records,
+            total_duration=select(func.coalesce(
+                func.sum(duration_seconds(
+                    col(Record.start),
+                    col(Record.end),
+                )),
+                0.0,
+            ))
+            .where(log_records)
+            .where(col(Record.end).is_not(None))
+            .scalar_subquery(),
+        ) \
+        .execution_options(
+            synchronize_session=False,
+            changed_log_ids=ids,
+        )
+    await session.execute(statement)
+
+
+async def close_open_records(
+    session: AsyncSession,
+    request_time: datetime,
+    log_ids: Optional[Collection[int]] = None,
+) -> list[int]:
+    """
+    End the open records of the given logs (all logs by default) at
+    the request time with one set-based UPDATE, returns ids of their logs
+
+    NOTE: update_log_summaries has to be called with the returned logs
+    """
+
+    conditions = [col(Record.end).is_(None)]
+    if log_ids is not None:
+        conditions.append(col(Record.log_id).in_(log_ids))
+    statement = update(Record) \
+        .where(*conditions) \
+        .values(end=request_time) \
+        .execution_options(
+            synchronize_session=False,
+            # Logs are named by update_log_summaries
+            changed_log_ids=(),
+            closes_open_records=None if log_ids is None else set(log_ids),
+        )
+    # Someone has shifted the time too much :D
+    future_start = HTTPException(
+        status_code=400,
+        detail=(
+            "Cannot pause a record that has not " +
+            "started yet (start is in the future)"
+        )
+    )
+    if session.bind.dialect.update_returning:
+        try:
+            result = await session.execute(
+                statement.returning(col(Record.log_id))
             )
-        db_record.end = request_time
-        session.add(db_record)
+        except IntegrityError:
+            # start_before_end (the session is not committed)
+            raise future_start
+        closed_log_ids = result.scalars().all()
+    else:
+        result_select = await session.exec(
+            select(Record.log_id, Record.start).where(*conditions)
+        )
+        rows = result_select.all()
+        if any(start > request_time for _, start in rows):
+            raise future_start
+        if rows:
+            await session.execute(statement)
+        closed_log_ids = [log_id for log_id, _ in rows]
+    return list(dict.fromkeys(closed_log_ids))
 
 
-def resume_last_paused_log(session: Session, request_time: datetime):
+async def pause_all_logs(
+    session: AsyncSession,
+    request_time: datetime,
+) -> list[int]:
     """
-    NOTE: assumes no log is currently running
+    Pause all running logs, returns their ids
+
+    NOTE: update_log_summaries has to be called with the returned logs
     """
 
+    paused_log_ids = await close_open_records(session, request_time)
+    if paused_log_ids:
+        result = await session.exec(
+            select(Log).where(col(Log.id).in_(paused_log_ids))
+        )
+        for db_log in result.all():
+            emit_log_event(session, "pause", db_log)
+    return paused_log_ids
+
+
+async def resume_last_paused_log(
+    session: AsyncSession,
+    request_time: datetime,
+) -> Optional[Log]:
+    """
+    Start a new record of the most recent non stopped log,
+    returns the log (None when there is no log to resume)
+
+    NOTE: assumes no log is currently running,
+    update_log_summaries has to be called with the returned log
+    """
+
+    # Summaries of logs already in the session may be outdated
+    # (see update_log_summaries)
     search_selector = select_non_stopped_logs() \
-        .offset(0).limit(1)
-    search_result = session.exec(search_selector)
+        .offset(0).limit(1) \
+        .execution_options(populate_existing=True)
+    search_result = await session.exec(search_selector)
     db_log = search_result.first()
     if not db_log:
         # No paused log found
-        return
+        return None
 
     # Check if record is paused (it should be, but let's make sure)
-    selector = select(Record) \
-        .where(Record.log_id == db_log.id) \
-        .where(col(Record.end).is_(None)) \
-        .limit(1)
-    result = session.exec(selector)
-    db_record = result.first()
-    if db_record:
+    if db_log.active:
         # Sanity check
         # This should not happen - inconsistent state
         # Let's just ignore it for now
         logger.warning(
             "Trying to resume last paused log, but the record is not paused"
         )
-        return
+        return None
 
     # Start a new record - resume the log
     session.add(Record(log_id=db_log.id, start=request_time))
+    emit_log_event(session, "resume", db_log)
+    return db_log
+
 
-    session.commit()
+async def split_logs_at(
+    session: AsyncSession,
+    new_log_ids: Mapping[int, int],
+    at: datetime,
+):
+    """
+    Move records of the logs starting at or after the time to the new
+    logs (log id -> new log id) and copy their flags, records containing
+    the time are cut in two
+
+    Uses a fixed number of set-based statements regardless of the number
+    of logs and records.
+    NOTE: update_log_summaries has to be called with both logs
+    """
+
+    if not new_log_ids:
+        return
+    log_ids = list(new_log_ids)
+    options = {
+        "synchronize_session": False,
+        "changed_log_ids": {*new_log_ids, *new_log_ids.values()},
+    }
+    crossing = (
+        col(Record.log_id).in_(log_ids),
+        col(Record.start) < at,
+        or_(col(Record.end).is_(None), col(Record.end) > at),
+    )
+
+    # Records after the split time
+    await session.execute(
+        update(Record)
+        .where(col(Record.log_id).in_(log_ids))
+        .where(col(Record.start) >= at)
+        .values(log_id=case(new_log_ids, value=col(Record.log_id)))
+        .execution_options(**options)
+    )
+    # Second halves of the records containing the split time
+    await session.execute(
+        insert(Record)
+        .from_select(
+            ["log_id", "meta", "start", "end"],
+            select(
+                case(new_log_ids, value=col(Record.log_id)),
+                col(Record.meta),
+                literal(at),
+                col(Record.end),
+            )
+            .where(*crossing),
+        )
+        .execution_options(**options)
+    )
+    # First halves
+    await session.execute(
+        update(Record)
+        .where(*crossing)
+        .values(end=at)
+        .execution_options(**options)
+    )
+    await session.execute(
+        insert(LogFlag)
+        .from_select(
+            ["log_id", "flag"],
+            select(
+                case(new_log_ids, value=col(LogFlag.log_id)),
+                col(LogFlag.flag),
+            )
+            .where(col(LogFlag.log_id).in_(log_ids)),
+        )
+        .execution_options(**options)
+    )
+
+
+async def merge_logs_into(
+    session: AsyncSession,
+    log_id: int,
+    other_log_ids: Collection[int],
+):
+    """
+    Move records and flags of the other logs to the log and delete them
+
+    Uses a fixed number of set-based statements regardless of the number
+    of logs and records (log properties are not merged).
+    NOTE: update_log_summaries has to be called with the log
+    """
+
+    if not other_log_ids:
+        return
+    options = {
+        "synchronize_session": False,
+        "changed_log_ids": {log_id, *other_log_ids},
+    }
+    await session.execute(
+        update(Record)
+        .where(col(Record.log_id).in_(other_log_ids))
+        .values(log_id=log_id)
+        .execution_options(**options)
+    )
+    # Union of the flags
+    await session.execute(
+        insert(LogFlag)
+        .from_select(
+            ["log_id", "flag"],
+            select(literal(log_id), col(LogFlag.flag))
+            .where(col(LogFlag.log_id).in_(other_log_ids))
+            .where(col(LogFlag.flag).not_in(
+                select(LogFlag.flag).where(LogFlag.log_id == log_id)
+            ))
+            .distinct(),
+        )
+        .execution_options(**options)
+    )
+    await session.execute(
+        delete(LogFlag)
+        .where(col(LogFlag.log_id).in_(other_log_ids))
+        .execution_options(**options)
+    )
+    await session.execute(
+        delete(Log)
+        .where(col(Log.id).in_(other_log_ids))
+        .execution_options(**options)
+    )
 
 
-def get_log_by_dynamic_id(session: Session, dynamic_log_id: int) -> Log:
+async def get_log_by_dynamic_id(
+    session: AsyncSession,
+    dynamic_log_id: int,
+) -> Log:
     if dynamic_log_id < 0:
         search_selector = select_non_stopped_logs() \
+            .options(*LOG_LOADER_OPTIONS) \
             .offset(-dynamic_log_id - 1) \
             .limit(1)
-        search_result = session.exec(search_selector)
+        search_result = await session.exec(search_selector)
         db_log = search_result.first()
     else:
-        db_log = session.get(Log, dynamic_log_id)
+        db_log = await session.get(
+            Log,
+            dynamic_log_id,
+            options=LOG_LOADER_OPTIONS,
+        )
     if not db_log:
         raise HTTPException(status_code=404, detail="Log not found")
     return db_log
 
 
+async def get_logs_by_dynamic_ids(
+    session: AsyncSession,
+    dynamic_log_ids: list[int],
+) -> list[Optional[Log]]:
+    """
+    Logs in the order of the ids (None when not found), resolved with
+    a fixed number of queries regardless of the number of ids
+
+    NOTE: logs are loaded with LOG_LOADER_OPTIONS
+    """
+
+    # Negative ids count the non stopped logs from the most recent one
+    non_stopped_ids: list[int] = []
+    depth = -min(dynamic_log_ids, default=0)
+    if depth > 0:
+        non_stopped_ids = list((await session.exec(
+            select_non_stopped_logs()
+            .with_only_columns(col(Log.id))
+            .limit(depth)
+        )).all())
+
+    log_ids: list[Optional[int]] = []
+    for dynamic_log_id in dynamic_log_ids:
+        if dynamic_log_id >= 0:
+            log_ids.append(dynamic_log_id)
+        elif -dynamic_log_id <= len(non_stopped_ids):
+            log_ids.append(non_stopped_ids[-dynamic_log_id - 1])
+        else:
+            log_ids.append(None)
+
+    found_ids = {log_id for log_id in log_ids if log_id is not None}
+    db_logs: dict[Optional[int], Log] = {}
+    if found_ids:
+        result = await session.exec(
+            select(Log)
+            .where(col(Log.id).in_(found_ids))
+            .options(*LOG_LOADER_OPTIONS)
+        )
+        db_logs = {db_log.id: db_log for db_log in result.all()}
+    return [db_logs.get(log_id) for log_id in log_ids]
+
+
+class LogDetailRows(NamedTuple):
+    # (id, name, description)
+    tasks: Sequence[Any]
+    # (id, name, description)
+    categories: Sequence[Any]
+    # (log_id, flag) ordered by log and flag
+    flags: Sequence[Any]
+    # (log_id, id, meta, start, end) ordered by log and start
+    records: Sequence[Any]
+
+
+async def get_log_detail_rows(
+    session: AsyncSession,
+    db_logs: Sequence[Log],
+) -> LogDetailRows:
+    """
+    Tasks, categories, flags and records of the logs as plain rows,
+    much cheaper than loading them as objects with LOG_LOADER_OPTIONS
+    """
+
+    log_ids = [db_log.id for db_log in db_logs]
+    task_ids = {db_log.task_id for db_log in db_logs} - {None}
+    category_ids = {db_log.category_id for db_log in db_logs} - {None}
+    if not log_ids:
+        return LogDetailRows([], [], [], [])
+
+    tasks: Sequence[Any] = []
+    if task_ids:
+        tasks = (await session.exec(
+            select(Task.id, Task.name, Task.description)
+            .where(col(Task.id).in_(task_ids))
+        )).all()
+    categories: Sequence[Any] = []
+    if category_ids:
+        categories = (await session.exec(
+            select(Category.id, Category.name, Category.description)
+            .where(col(Category.id).in_(category_ids))
+        )).all()
+    flags = (await session.exec(
+        select(LogFlag.log_id, LogFlag.flag)
+        .where(col(LogFlag.log_id).in_(log_ids))
+        .order_by(col(LogFlag.log_id), col(LogFlag.flag))
+    )).all()
+    records = (await session.exec(
+        select(Record.log_id, Record.id, Record.meta, Record.start, Record.end)
+        .where(col(Record.log_id).in_(log_ids))
+        .order_by(col(Record.log_id), col(Record.start))
+    )).all()
+    return LogDetailRows(tasks, categories, flags, records)
+
+
 def select_active_record() -> SelectOfScalar[Record]:
     return select(Record) \
         .where(col(Record.end).is_(None)) \
@@ -90,17 +511,110 @@ def select_active_record() -> SelectOfScalar[Record]:
         .limit(1)
 
 
+async def find_active_record(session: AsyncSession) -> Optional[ActiveRecord]:
+    """
+    Ids of the active record (the most recently started open record)
+    and its log, served from the active record cache when possible
+    """
+
+    state = active_record_cache.state
+    if ACTIVE_RECORD_CACHE == "on" and not isinstance(state, Unknown):
+        return state
+
+    generation = active_record_cache.generation
+    # The second row tells whether the most recent open record
+    # is the only one
+    result = await session.exec(select_active_record().limit(2))
+    db_records = result.all()
+    active = None
+    if db_records:
+        assert db_records[0].id is not None
+        active = ActiveRecord(db_records[0].id, db_records[0].log_id)
+
+    if ACTIVE_RECORD_CACHE == "validate" and \
+            not isinstance(state, Unknown) and state != active:
+        logger.error(
+            "Active record cache mismatch: cached %s, database %s",
+            state,
+            active,
+        )
+    # The cache stands for all open records, with more of them it
+    # would forget the others once the cached one is closed
+    if ACTIVE_RECORD_CACHE != "off" and len(db_records) < 2:
+        active_record_cache.store(active, generation)
+    return active
+
+
+async def get_active_record(session: AsyncSession) -> Optional[Record]:
+    active = await find_active_record(session)
+    if active is None:
+        return None
+    db_record = await session.get(Record, active.record_id)
+    if db_record is None or db_record.end is not None:
+        # The record was changed behind the cache (e.g. by another process)
+        logger.warning("Active record cache is out of date")
+        active_record_cache.invalidate()
+        result = await session.exec(select_active_record())
+        db_record = result.first()
+    return db_record
+
+
 def select_non_stopped_logs() -> SelectOfScalar[Log]:
     return select(Log) \
         .where(col(Log.stopped).is_(False)) \
-        .join(Record, isouter=True) \
-        .group_by(Log.id) \
-        .order_by(func.max(col(Record.start)).desc()) \
+        .order_by(col(Log.last_start).desc().nulls_last()) \
         .order_by(col(Log.id).desc())
 
 
-def apply_log_create(
-    session: Session,
+async def find_name_id(
+    session: AsyncSession,
+    model: NamedModel,
+    name: str,
+) -> Optional[int]:
+    """
+    Id of the task/category with the given name (None if there is none),
+    from the name cache when possible
+    """
+
+    cache = get_name_cache(session, model)
+    if cache is not None:
+        model_id = cache.get_id(name)
+        if model_id is not None:
+            return model_id
+        generation = cache.generation
+    result = await session.exec(
+        select(model.id)
+        .where(model.name == name)
+    )
+    model_id = result.first()
+    if cache is not None and model_id is not None:
+        cache.store(model_id, name, generation)
+    return model_id
+
+
+async def name_id_exists(
+    session: AsyncSession,
+    model: NamedModel,
+    model_id: int,
+) -> bool:
+    # Same as find_name_id, by id
+    cache = get_name_cache(session, model)
+    if cache is not None:
+        if cache.get_name(model_id) is not None:
+            return True
+        generation = cache.generation
+    result = await session.exec(
+        select(model.name)
+        .where(model.id == model_id)
+    )
+    name = result.first()
+    if cache is not None and name is not None:
+        cache.store(model_id, name, generation)
+    return name is not None
+
+
+async def apply_log_create(
+    session: AsyncSession,
     request_time: datetime,
     source: Optional[LogCreate],
     create_category: bool,
@@ -118,34 +632,30 @@ def apply_log_create(
             if value is None:
                 target.task = None
                 continue
-            selector_task = select(Task) \
-                .where(Task.name == value)
-            result_task = session.exec(selector_task)
-            db_task = result_task.first()
-            if not db_task:
-                if not create_task:
-                    raise HTTPException(
-                        status_code=404,
-                        detail="Task not found"
-                    )
-                db_task = Task(name=value)
-            target.task = db_task
+            task_id = await find_name_id(session, Task, value)
+            if task_id is not None:
+                target.task_id = task_id
+            elif not create_task:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Task not found"
+                )
+            else:
+                target.task = Task(name=value)
         elif key == "category":
             if value is None:
                 target.category = None
                 continue
-            selector_category = select(Category) \
-                .where(Category.name == value)
-            result_category = session.exec(selector_category)
-            db_category = result_category.first()
-            if not db_category:
-                if not create_category:
-                    raise HTTPException(
-                        status_code=404,
-                        detail="Category not found"
-                    )
-                db_category = Category(name=value)
-            target.category = db_category
+            category_id = await find_name_id(session, Category, value)
+            if category_id is not None:
+                target.category_id = category_id
+            elif not create_category:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Category not found"
+                )
+            else:
+                target.category = Category(name=value)
         elif key == "flags":
             if value is None:
                 continue
@@ -154,3 +664,179 @@ def apply_log_create(
         else:
             setattr(target, key, value)
     return target
+
+
+async def resolve_names(
+    session: AsyncSession,
+    model: NamedModel,
+    names: set[str],
+    create: bool,
+) -> dict[str, int]:
+    """
+    Map task/category names to ids with a single lookup (of the names
+    not in the name cache), missing ones are created if allowed
+    """
+
+    if not names:
+        return {}
+
+    ids: dict[str, int] = {}
+    cache = get_name_cache(session, model)
+    if cache is not None:
+        for name in names:
+            model_id = cache.get_id(name)
+            if model_id is not None:
+                ids[name] = model_id
+        generation = cache.generation
+
+    missing = names - ids.keys()
+    if missing:
+        result = await session.execute(
+            select(model.id, model.name)
+            .where(col(model.name).in_(missing))
+        )
+        for model_id, name in result:
+            ids[name] = model_id
+            if cache is not None:
+                cache.store(model_id, name, generation)
+
+    missing = names - ids.keys()
+    if missing:
+        if not create:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{model.__name__} not found: " +
+                ", ".join(sorted(missing))
+            )
+        result = await session.execute(
+            insert(model).returning(col(model.id), col(model.name)),
+            [
+                {"name": name, "description": None}
+                for name in sorted(missing)
+            ],
+        )
+        ids.update({name: model_id for model_id, name in result})
+    return ids
+
+
+async def check_ids_exist(
+    session: AsyncSession,
+    model: NamedModel,
+    ids: set[int],
+):
+    cache = get_name_cache(session, model)
+    if cache is not None:
+        ids = {
+            model_id for model_id in ids
+            if cache.get_name(model_id) is None
+        }
+    if not ids:
+        return
+    result = await session.execute(
+        select(model.id)
+        .where(col(model.id).in_(ids))
+    )
+    missing = ids - set(result.scalars())
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"{model.__name__} not found: " +
+            ", ".join(str(model_id) for model_id in sorted(missing))
+        )
+
+
+async def insert_logs(
+    session: AsyncSession,
+    logs: Sequence[LogImport],
+    create_category: bool,
+    create_task: bool,
+) -> tuple[list[int], int]:
+    """
+    Insert the logs with their flags and records using executemany
+
+    Returns ids of the created logs (in order) and number of records.
+    NOTE: does not commit
+    """
+
+    for log in logs:
+        if log.category is not None and log.category_id is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Use either category or category_id, not both"
+            )
+        if log.task is not None and log.task_id is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Use either task or task_id, not both"
+            )
+
+    category_ids = await resolve_names(
+        session,
+        Category,
+        {log.category for log in logs if log.category is not None},
+        create_category,
+    )
+    task_ids = await resolve_names(
+        session,
+        Task,
+        {log.task for log in logs if log.task is not None},
+        create_task,
+    )
+    await check_ids_exist(
+        session,
+        Category,
+        {log.category_id for log in logs if log.category_id is not None},
+    )
+    await check_ids_exist(
+        session,
+        Task,
+        {log.task_id for log in logs if log.task_id is not None},
+    )
+
+    log_rows = []
+    for log in logs:
+        category_id = log.category_id
+        if log.category is not None:
+            category_id = category_ids[log.category]
+        task_id = log.task_id
+        if log.task is not None:
+            task_id = task_ids[log.task]
+        log_rows.append({
+            "category_id": category_id,
+            "task_id": task_id,
+            "meta": log.meta,
+            "stopped": log.stopped,
+            "name": log.name,
+            "description": log.description,
+            # Computed by update_log_summaries below
+            "active": False,
+            "total_duration": 0,
+        })
+    # Neither the order of the assigned ids nor the order of the returned
+    # rows follows the parameters, only sort_by_parameter_order does
+    # (PostgreSQL keeps a single statement, SQLite inserts row by row)
+    result = await session.execute(
+        insert(Log).returning(col(Log.id), sort_by_parameter_order=True),
+        log_rows,
+    )
+    log_ids = list(result.scalars())
+
+    record_rows = []
+    flag_rows = []
+    for log_id, log in zip(log_ids, logs):
+        for record in log.records or []:
+            record_rows.append({
+                "log_id": log_id,
+                "meta": record.meta,
+                "start": record.start,
+                "end": record.end,
+            })
+        for flag in sorted({flag.flag for flag in log.flags or []}):
+            flag_rows.append({"log_id": log_id, "flag": flag})
+    if record_rows:
+        await session.execute(Record.__table__.insert(), record_rows)
+    if flag_rows:
+        await session.execute(LogFlag.__table__.insert(), flag_rows)
+
+    await update_log_summaries(session, log_ids)
+    return log_ids, len(record_rows)
@@ -0,0 +1,68 @@
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import Subquery, column, literal_column, table
+from sqlmodel import select, func, col
+
+from metasking.model import Log
+
+
+# Index maintained by the database (see the full text search migration):
+# SQLite - FTS5 table log_fts synchronized by triggers
+# PostgreSQL - generated tsvector column log.search with a GIN index
+
+WORD_PATTERN = re.compile(r"\w+")
+
+log_fts = table("log_fts", column("rowid"))
+
+
+def search_terms(query: str) -> list[str]:
+    """
+    Words of the search query, punctuation and operators are ignored
+    """
+
+    terms = WORD_PATTERN.findall(query)
+    if not terms:
+        raise HTTPException(
+            status_code=400,
+            detail="Search query has no words"
+        )
+    return terms
+
+
+def search_fulltext(dialect: str, query: str) -> Subquery:
+    """
+    Logs matching all words of the query (as prefixes) in name or
+    description, columns log_id and rank (lower is better)
+    """
+
+    terms = search_terms(query)
+
+    if dialect == "sqlite":
+        fts = literal_column("log_fts")
+        match = " ".join(f'"{term}"*' for term in terms)
+        return select(
+            log_fts.c.rowid.label("log_id"),
+            # Name weighs more than description
+            func.bm25(fts, 2.0, 1.0).label("rank"),
+        ) \
+            .where(fts.op("MATCH")(match)) \
+            .subquery("search")
+
+    if dialect == "postgresql":
+        search = literal_column("log.search")
+        ts_query = func.to_tsquery(
+            "simple",
+            " & ".join(f"'{term}':*" for term in terms),
+        )
+        return select(
+            col(Log.id).label("log_id"),
+            (-func.ts_rank_cd(search, ts_query)).label("rank"),
+        ) \
+            .where(search.op("@@")(ts_query)) \
+            .subquery("search")
+
+    raise HTTPException(
+        status_code=501,
+        detail=f"Full text search is not supported on {dialect}"
+    )
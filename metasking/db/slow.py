@@ -0,0 +1,174 @@
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metasking.logger import logger
+from metasking.model import SlowQuery
+
+
+# ASGI scope of the request being handled (set by the metrics middleware),
+# the router adds the matched route to it
+current_scope: ContextVar[Optional[dict[str, Any]]] = ContextVar(
+    "current_scope",
+    default=None,
+)
+
+EXPLAIN = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def redact(value: Any) -> Any:
+    """
+    Hide values that may contain user data (texts, json), keep their
+    type and size
+    """
+
+    if value is None or isinstance(value, (bool, int, float, datetime)):
+        return value
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters: Any) -> list[Any]:
+    if isinstance(parameters, dict):
+        return [redact(value) for value in parameters.values()]
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    return [redact(parameters)]
+
+
+def format_plan(dialect: str, rows: list[tuple]) -> list[str]:
+    if dialect != "sqlite":
+        return [str(row[0]) for row in rows]
+
+    # Render the plan tree (id, parent, notused, detail)
+    depth: dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def explain(
+    dbapi_connection: Any,
+    dialect: str,
+    statement: str,
+    parameters: Any,
+) -> list[str]:
+    """
+    Query plan of the statement, executed on the same connection
+    (inside the current transaction) without triggering engine events
+    """
+
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect == "postgresql":
+            # Failed statement would abort the whole transaction
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(EXPLAIN[dialect] + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        else:
+            cursor.execute(EXPLAIN[dialect] + statement, parameters)
+            rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return format_plan(dialect, rows)
+
+
+class SlowQueryLog:
+    """
+    Log statements exceeding the threshold and keep the most recent ones
+    """
+
+    def __init__(self, threshold: float, size: int, capture_plan: bool):
+        # Milliseconds
+        self.threshold = threshold
+        self.capture_plan = capture_plan
+        self.queries: deque[SlowQuery] = deque(maxlen=size)
+
+    def register(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self.before_execute)
+        event.listen(engine, "after_cursor_execute", self.after_execute)
+        event.listen(engine, "handle_error", self.failed_execute)
+
+    def before_execute(
+        self, conn, cursor, statement, parameters, context, many
+    ):
+        conn.info.setdefault("slow_query_start", []).append(
+            time.perf_counter()
+        )
+
+    def failed_execute(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("slow_query_start"):
+            connection.info["slow_query_start"].pop()
+
+    def after_execute(
+        self, conn, cursor, statement, parameters, context, many
+    ):
+        duration = (
+            time.perf_counter() - conn.info["slow_query_start"].pop()
+        ) * 1000
+        if duration < self.threshold:
+            return
+
+        scope = current_scope.get()
+        method = route = None
+        if scope is not None:
+            method = scope.get("method")
+            route = getattr(scope.get("route"), "path", scope.get("path"))
+
+        dialect = conn.dialect.name
+        plan = None
+        plan_error = None
+        if self.capture_plan and not many and dialect in EXPLAIN and \
+                statement.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                plan = explain(
+                    conn.connection.dbapi_connection,
+                    dialect,
+                    statement,
+                    parameters,
+                )
+            except Exception as e:
+                plan_error = str(e)
+
+        query = SlowQuery(
+            time=datetime.now(),
+            duration=round(duration, 3),
+            method=method,
+            route=route,
+            statement=statement,
+            parameters=(
+                [redact_parameters(p) for p in parameters]
+                if many else redact_parameters(parameters)
+            ),
+            plan=plan,
+            plan_error=plan_error,
+        )
+        self.queries.append(query)
+        logger.warning(
+            "Slow query (%.1f ms) in %s %s: %s\nParameters: %s\nPlan:\n%s",
+            query.duration,
+            method,
+            route,
+            " ".join(statement.split()),
+            query.parameters,
+            "\n".join(plan) if plan is not None else plan_error,
+        )
@@ -0,0 +1,128 @@
+import secrets
+from collections import OrderedDict
+from typing import Any, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, SessionTransaction
+from sqlmodel.orm.session import Session
+
+from metasking.model import Log, Record, LogFlag
+
+
+# Number of logs whose version is remembered, the older ones share
+# the version of the least recent eviction
+LOG_VERSIONS_SIZE = 10000
+
+
+class DataVersion:
+    """
+    Process-local version of the data, bumped by every committed change
+
+    Every log has its own version (the data version of its last change),
+    changes that cannot be attributed to particular logs (bulk statements,
+    tasks and categories shown inside logs) bump all of them.
+    NOTE: only valid as long as a single process writes to the database
+    """
+
+    def __init__(self):
+        # Versions of a previous run of the process must not match
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        # Version of all logs not in log_versions
+        self.floor = 0
+        self.log_versions: OrderedDict[int, int] = OrderedDict()
+
+    def get_log_version(self, log_id: int) -> int:
+        return self.log_versions.get(log_id, self.floor)
+
+    def apply(self, log_ids: Optional[set[int]]):
+        """
+        Bump the version after a commit changing the given logs
+        (None - any log could have changed)
+        """
+
+        self.version += 1
+        if log_ids is None:
+            self.floor = self.version
+            self.log_versions.clear()
+            return
+        for log_id in log_ids:
+            self.log_versions[log_id] = self.version
+            self.log_versions.move_to_end(log_id)
+        while len(self.log_versions) > LOG_VERSIONS_SIZE:
+            _, evicted = self.log_versions.popitem(last=False)
+            self.floor = max(self.floor, evicted)
+
+    def etag(self, log_id: Optional[int] = None) -> str:
+        """
+        Weak ETag of the whole data or of a single log
+        """
+
+        if log_id is None:
+            return f'W/"{self.epoch}.{self.version}"'
+        version = self.get_log_version(log_id)
+        return f'W/"{self.epoch}.{log_id}.{version}"'
+
+
+data_version = DataVersion()
+
+
+# Track changed logs of every session, bump the version on commit
+
+ANY_LOG = "any"
+
+
+def _pending_logs(session: Session) -> set[Any]:
+    return session.info.setdefault("data_version_logs", set())
+
+
+def _changed_log_ids(obj: Any) -> list[Optional[int]]:
+    if isinstance(obj, Log):
+        return [obj.id]
+    if isinstance(obj, (Record, LogFlag)):
+        # Moved between logs (split, merge) changes both of them
+        history = inspect(obj).attrs.log_id.history
+        return [obj.log_id, *history.deleted]
+    # Tasks and categories are part of the logs
+    return [ANY_LOG]
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_logs(session: Session, flush_context: Any):
+    pending = _pending_logs(session)
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        pending.update(_changed_log_ids(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_logs(orm_execute_state: ORMExecuteState):
+    # Statements executed without the unit of work (bulk insert, update...)
+    # can name the logs they change, see update_log_summaries
+    if orm_execute_state.is_insert or \
+            orm_execute_state.is_update or \
+            orm_execute_state.is_delete:
+        log_ids = orm_execute_state.execution_options.get(
+            "changed_log_ids",
+            [ANY_LOG],
+        )
+        _pending_logs(orm_execute_state.session).update(log_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_logs(session: Session):
+    pending = session.info.pop("data_version_logs", None)
+    if pending:
+        pending.discard(None)
+        data_version.apply(None if ANY_LOG in pending else pending)
+
+
+# Not after_begin - the first statement of a transaction is seen by
+# do_orm_execute before the transaction begins
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending_logs(
+    session: Session,
+    transaction: SessionTransaction,
+):
+    # Committed changes are already applied, drop the rolled back ones
+    if transaction.parent is None:
+        session.info.pop("data_version_logs", None)
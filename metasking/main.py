@@ -2,18 +2,32 @@ import os
 import traceback
 
 from fastapi import FastAPI, Request, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 import metasking.logger  # noqa: F401
 import metasking.model  # noqa: F401
 
 from metasking.api import api_router as api
 from metasking.model import ErrorModel
+from metasking.metrics import MetricsMiddleware, render_metrics
 
 root_path = os.getenv("ROOT_PATH", "")
 app = FastAPI(title="meTasking", root_path=root_path)
 
 app.include_router(api, prefix="/api")
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Request and database metrics in the Prometheus text format
+    """
+
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4",
+    )
 
 
 @app.exception_handler(Exception)
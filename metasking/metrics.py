@@ -0,0 +1,230 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metasking.db import current_scope
+from metasking.db.db import engine
+
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Route label of requests not matching any route
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        # Last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """
+    Database usage of a single request, collected by the engine events
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_time = 0.0
+        self.responses: dict[int, int] = {}
+
+    def observe(self, request: RequestMetrics, status: int, elapsed: float):
+        self.latency.observe(elapsed)
+        self.statements.observe(request.statements)
+        self.db_time += request.db_time
+        self.responses[status] = self.responses.get(status, 0) + 1
+
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar(
+    "current_request",
+    default=None,
+)
+
+# (method, route) -> metrics, process-local
+routes: dict[tuple[str, str], RouteMetrics] = {}
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, many):
+    start = conn.info["statement_start"].pop()
+    request = current_request.get()
+    if request is not None:
+        request.statements += 1
+        request.db_time += time.perf_counter() - start
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _failed_statement(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("statement_start"):
+        connection.info["statement_start"].pop()
+
+
+def server_timing(request: RequestMetrics, elapsed: float) -> str:
+    return (
+        f"app;dur={elapsed * 1000:.2f}, " +
+        f"db;dur={request.db_time * 1000:.2f};" +
+        f"desc=\"{request.statements} statements\""
+    )
+
+
+class MetricsMiddleware:
+    """
+    Measure latency and database usage of every request, the result is
+    sent in the Server-Timing header and aggregated per route
+    (see render_metrics)
+
+    NOTE: the timing of streamed responses covers the response start only
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        token = current_request.set(request)
+        scope_token = current_scope.set(scope)
+        status = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - request.start
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    server_timing(request, elapsed).encode("latin-1"),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            current_scope.reset(scope_token)
+            elapsed = time.perf_counter() - request.start
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            key = (scope["method"], route_path)
+            if key not in routes:
+                routes[key] = RouteMetrics()
+            routes[key].observe(request, status, elapsed)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"") \
+        .replace("\n", "\\n")
+
+
+def format_labels(labels: dict[str, Any]) -> str:
+    return "{" + ",".join(
+        f"{name}=\"{escape_label(str(value))}\""
+        for name, value in labels.items()
+    ) + "}"
+
+
+def render_histogram(
+    lines: list[str],
+    name: str,
+    labels: dict[str, Any],
+    histogram: Histogram,
+):
+    cumulative = 0
+    bounds = [*map(str, histogram.buckets), "+Inf"]
+    for bound, count in zip(bounds, histogram.counts):
+        cumulative += count
+        bucket_labels = format_labels({**labels, "le": bound})
+        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+
+def render_metrics() -> str:
+    """
+    Metrics of all routes in the Prometheus text exposition format
+    """
+
+    items = sorted(routes.items())
+    lines = [
+        "# HELP metasking_http_requests_total Requests by response status",
+        "# TYPE metasking_http_requests_total counter",
+    ]
+    for (method, route), metrics in items:
+        for status, count in sorted(metrics.responses.items()):
+            labels = format_labels(
+                {"method": method, "route": route, "status": status}
+            )
+            lines.append(f"metasking_http_requests_total{labels} {count}")
+
+    lines += [
+        "# HELP metasking_http_request_duration_seconds Request latency",
+        "# TYPE metasking_http_request_duration_seconds histogram",
+    ]
+    for (method, route), metrics in items:
+        render_histogram(
+            lines,
+            "metasking_http_request_duration_seconds",
+            {"method": method, "route": route},
+            metrics.latency,
+        )
+
+    lines += [
+        "# HELP metasking_db_statements_per_request SQL statements " +
+        "executed by a request",
+        "# TYPE metasking_db_statements_per_request histogram",
+    ]
+    for (method, route), metrics in items:
+        render_histogram(
+            lines,
+            "metasking_db_statements_per_request",
+            {"method": method, "route": route},
+            metrics.statements,
+        )
+
+    lines += [
+        "# HELP metasking_db_duration_seconds_total Time spent executing " +
+        "SQL statements",
+        "# TYPE metasking_db_duration_seconds_total counter",
+    ]
+    for (method, route), metrics in items:
+        labels = format_labels({"method": method, "route": route})
+        lines.append(
+            f"metasking_db_duration_seconds_total{labels} {metrics.db_time}"
+        )
+
+    return "\n".join(lines) + "\n"
@@ -3,19 +3,26 @@ from .base import (
 )
 from .log import (
     LogRecordUpdate,
+    LogSummary,
     Log,
     LogRead,
     LogReadWithRecords,
+    LogBatchItem,
     LogCreate,
     LogCreateWithRecords,
+    LogImport,
+    LogImportChunk,
+    LogImportResult,
     LogUpdateWithRecords,
 )
 from .record import (
     Record,
     RecordCreate,
     RecordRead,
+    RecordBatchItem,
     RecordReadInsideLog,
     RecordReadWithLog,
+    RecordTimeline,
     RecordCreateInsideLog,
     RecordUpdate,
 )
@@ -35,6 +42,16 @@ from .flag import (
     LogFlag,
     LogFlagInsideLog,
 )
+from .report import (
+    ReportEntry,
+    Report,
+)
+from .admin import (
+    SlowQuery,
+)
+from .event import (
+    LogEvent,
+)
 
 
 # Update circular imports
@@ -54,12 +71,19 @@ LogCreateWithRecords.update_forward_refs(
     LogFlagInsideLog=LogFlagInsideLog,
     RecordCreateInsideLog=RecordCreateInsideLog,
 )
+LogImport.update_forward_refs(
+    LogFlagInsideLog=LogFlagInsideLog,
+    RecordCreateInsideLog=RecordCreateInsideLog,
+)
 Record.update_forward_refs(
     Log=Log,
 )
 RecordReadWithLog.update_forward_refs(
     LogRead=LogRead,
 )
+RecordTimeline.update_forward_refs(
+    LogRead=LogRead,
+)
 Task.update_forward_refs(
     Log=Log,
 )
@@ -74,17 +98,24 @@ LogFlag.update_forward_refs(
 __all__ = [
     "ErrorModel",
     "LogRecordUpdate",
+    "LogSummary",
     "Log",
     "LogRead",
     "LogReadWithRecords",
+    "LogBatchItem",
     "LogCreate",
     "LogCreateWithRecords",
+    "LogImport",
+    "LogImportChunk",
+    "LogImportResult",
     "LogUpdateWithRecords",
     "Record",
     "RecordCreate",
     "RecordRead",
+    "RecordBatchItem",
     "RecordReadInsideLog",
     "RecordReadWithLog",
+    "RecordTimeline",
     "RecordCreateInsideLog",
     "RecordUpdate",
     "Task",
@@ -97,4 +128,8 @@ __all__ = [
     "CategoryUpdate",
     "LogFlag",
     "LogFlagInsideLog",
+    "ReportEntry",
+    "Report",
+    "SlowQuery",
+    "LogEvent",
 ]
@@ -0,0 +1,18 @@
+from typing import Any, Optional
+from datetime import datetime
+from sqlmodel import SQLModel
+
+
+class SlowQuery(SQLModel):
+    time: datetime
+    # Milliseconds
+    duration: float
+    # Request that issued the statement (if any)
+    method: Optional[str] = None
+    route: Optional[str] = None
+    statement: str
+    # Bound parameters, texts are redacted (list of lists for executemany)
+    parameters: list[Any]
+    # Query plan (EXPLAIN) or the reason it is missing
+    plan: Optional[list[str]] = None
+    plan_error: Optional[str] = None
@@ -0,0 +1,17 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel
+
+
+class LogEvent(SQLModel):
+    # Sequence number of the event within the process
+    id: int
+    # create, start, next, pause, resume, stop, split, merge, update, delete
+    # or reset (events were missed, reload the state)
+    type: str
+    time: datetime
+    log_id: Optional[int] = None
+    # New log of a split, log merged into log_id
+    related_log_id: Optional[int] = None
+    task_id: Optional[int] = None
+    category_id: Optional[int] = None
@@ -3,6 +3,7 @@ from sqlmodel import (
     Field,
     SQLModel,
     Relationship,
+    Index,
 )
 
 if TYPE_CHECKING:
@@ -11,6 +12,11 @@ if TYPE_CHECKING:
 
 
 class LogFlagBase(SQLModel):
+    __table_args__ = (
+        # Flag filter (primary key starts with log_id)
+        Index("ix_logflag_flag_log_id", "flag", "log_id"),
+    )
+
     log_id: Optional[int] = Field(
         default=None,
         primary_key=True,
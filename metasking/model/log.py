@@ -6,6 +6,7 @@ from sqlmodel import (
     Relationship,
     JSON,
     Column,
+    Index,
 )
 
 if TYPE_CHECKING:
@@ -33,16 +34,41 @@ class LogRecordUpdate(SQLModel):
     end: Optional[datetime] = None
 
 
+class LogSummary(SQLModel):
+    # Summary of the log records, stored to avoid aggregating records
+    # Maintained by metasking.db.update_log_summaries
+
+    # Start of the first record
+    start: Optional[datetime] = None
+    # Start of the last record
+    last_start: Optional[datetime] = None
+    # End of the last record (None if the log is active)
+    end: Optional[datetime] = None
+    # Log has a record without end
+    active: bool = False
+    # Total duration of finished records in seconds
+    total_duration: float = 0
+
+
 class LogBase(SQLModel):
-    # __table_args__ = (
-    #     # Log cannot be stopped if it has records without end
-    #     CheckConstraint(
-    #         '"stopped" = FALSE OR ' +
-    #         'NOT EXISTS (SELECT 1 FROM record ' +
-    #         'WHERE "log_id" = :id AND "end" IS NULL)',
-    #         name="log_cannot_be_stopped_if_it_has_records_without_end"
-    #     ),
-    # )
+    __table_args__ = (
+        # # Log cannot be stopped if it has records without end
+        # CheckConstraint(
+        #     '"stopped" = FALSE OR ' +
+        #     'NOT EXISTS (SELECT 1 FROM record ' +
+        #     'WHERE "log_id" = :id AND "end" IS NULL)',
+        #     name="log_cannot_be_stopped_if_it_has_records_without_end"
+        # ),
+        # Non-stopped logs lookup (ordered by the last activity),
+        # descending key order on PostgreSQL (see migration 6ae732cc1800)
+        Index("ix_log_stopped_last_start_id", "stopped", "last_start", "id"),
+        # List ordering
+        Index("ix_log_last_start_id", "last_start", "id"),
+        Index("ix_log_start_id", "start", "id"),
+        # List filters
+        Index("ix_log_category_id", "category_id"),
+        Index("ix_log_task_id", "task_id"),
+    )
     category_id: Optional[int] = Field(
         default=None,
         foreign_key="category.id",
@@ -62,7 +88,7 @@ class LogBase(SQLModel):
     description: Optional[str] = None
 
 
-class Log(LogBase, table=True):  # type: ignore
+class Log(LogBase, LogSummary, table=True):  # type: ignore
     id: Optional[int] = Field(default=None, primary_key=True)
 
     task: Optional["Task"] = Relationship(back_populates="logs")
@@ -81,11 +107,11 @@ class Log(LogBase, table=True):  # type: ignore
     )
 
 
-class LogRead(LogBase):
+class LogRead(LogBase, LogSummary):
     id: int
 
 
-class LogReadWithRecords(SQLModel):
+class LogReadWithRecords(LogSummary):
     id: int
     meta: Optional[dict[str, Any]] = Field(
         default=None,
@@ -99,7 +125,11 @@ class LogReadWithRecords(SQLModel):
     flags: list["LogFlagInsideLog"]
     records: list["RecordReadInsideLog"]
 
-    # TODO: computed field - active, totalDuration, start, end
+
+class LogBatchItem(SQLModel):
+    # Requested (dynamic) id, the log is None when not found
+    id: int
+    log: Optional[LogReadWithRecords] = None
 
 
 class LogCreate(SQLModel):
@@ -119,6 +149,28 @@ class LogCreateWithRecords(LogBase):
     records: Optional[list["RecordCreateInsideLog"]] = None
 
 
+class LogImport(LogCreateWithRecords):
+    # Names are resolved to category_id/task_id (use either name or id)
+    category: Optional[str] = None
+    task: Optional[str] = None
+
+
+class LogImportChunk(SQLModel):
+    # Position of the first log of the chunk in the imported data
+    offset: int
+    logs: int
+    records: int
+    # Ids of the created logs (in order), empty if the chunk failed
+    log_ids: list[int]
+    error: Optional[str] = None
+
+
+class LogImportResult(SQLModel):
+    logs: int = 0
+    records: int = 0
+    chunks: list[LogImportChunk] = []
+
+
 class LogUpdateWithRecords(SQLModel):
     category: Optional[str] = None
     task: Optional[str] = None
@@ -7,6 +7,8 @@ from sqlmodel import (
     JSON,
     Column,
     CheckConstraint,
+    Index,
+    text,
 )
 
 if TYPE_CHECKING:
@@ -41,6 +43,16 @@ class RecordBase(SQLModel):
         #     'WHERE id = :log_id AND "stopped" = TRUE)',
         #     name="record_without_end_if_log_stopped"
         # ),
+        # Records of a log (ordered by start)
+        Index("ix_record_log_id_start", "log_id", "start"),
+        # Active record lookup (only a handful of records are without end)
+        Index(
+            "ix_record_open",
+            "end",
+            "start",
+            sqlite_where=text('"end" IS NULL'),
+            postgresql_where=text('"end" IS NULL'),
+        ),
     )
     log_id: Optional[int] = Field(
         default=None,
@@ -72,6 +84,12 @@ class RecordRead(RecordBase):
     id: int
 
 
+class RecordBatchItem(SQLModel):
+    # Requested id, the record is None when not found
+    id: int
+    record: Optional[RecordRead] = None
+
+
 class RecordReadInsideLog(SQLModel):
     id: int
     meta: Optional[dict[str, Any]] = Field(
@@ -89,6 +107,16 @@ class RecordReadWithLog(RecordRead):
     log: "LogRead"
 
 
+class RecordTimeline(SQLModel):
+    # Records overlapping the window as columns (ordered by start)
+    ids: list[int] = []
+    log_ids: list[int] = []
+    starts: list[datetime] = []
+    ends: list[Optional[datetime]] = []
+    # Logs of the records by id
+    logs: dict[int, "LogRead"] = {}
+
+
 class RecordCreateInsideLog(SQLModel):
     meta: Optional[dict[str, Any]] = Field(
         default=None,
@@ -0,0 +1,26 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel
+
+
+class ReportEntry(SQLModel):
+    # Group keys, set only for the requested groupings
+
+    # Start of the day/week/month
+    bucket: Optional[datetime] = None
+    category_id: Optional[int] = None
+    category: Optional[str] = None
+    task_id: Optional[int] = None
+    task: Optional[str] = None
+    flag: Optional[str] = None
+    log_id: Optional[int] = None
+    log_name: Optional[str] = None
+
+    # Tracked time in seconds
+    duration: float = 0
+
+
+class Report(SQLModel):
+    since: datetime
+    until: datetime
+    entries: list[ReportEntry]
@@ -0,0 +1,320 @@
+from datetime import datetime
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+import msgpack
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+
+from metasking.db import LogDetailRows
+from metasking.model import Log, Task, Category
+
+
+# Fast path for log responses
+#
+# Build the payloads straight from the loaded ORM objects and encode them
+# with orjson instead of validating them through the read models.
+# The payloads must match the models (field order included):
+# LogReadWithRecords, LogRead, TaskRead, CategoryRead, LogFlagInsideLog
+# and RecordReadInsideLog. Endpoints keep their response_model for the
+# OpenAPI schema, FastAPI skips it when a response is returned.
+
+
+def dump_named(db_object: Optional[Task | Category]) -> Optional[dict]:
+    if db_object is None:
+        return None
+    return {
+        "name": db_object.name,
+        "description": db_object.description,
+        "id": db_object.id,
+    }
+
+
+def dump_log(db_log: Log) -> dict[str, Any]:
+    """
+    LogReadWithRecords payload (relationships must be loaded)
+    """
+
+    return {
+        "start": db_log.start,
+        "last_start": db_log.last_start,
+        "end": db_log.end,
+        "active": db_log.active,
+        "total_duration": float(db_log.total_duration),
+        "id": db_log.id,
+        "meta": db_log.meta,
+        "stopped": db_log.stopped,
+        "name": db_log.name,
+        "description": db_log.description,
+        "task": dump_named(db_log.task),
+        "category": dump_named(db_log.category),
+        "flags": [{"flag": db_flag.flag} for db_flag in db_log.flags],
+        "records": [
+            {
+                "id": db_record.id,
+                "meta": db_record.meta,
+                "start": db_record.start,
+                "end": db_record.end,
+            }
+            for db_record in db_log.records
+        ],
+    }
+
+
+def dump_log_read(db_log: Log) -> dict[str, Any]:
+    """
+    LogRead payload (log without relationships)
+    """
+
+    return {
+        "start": db_log.start,
+        "last_start": db_log.last_start,
+        "end": db_log.end,
+        "active": db_log.active,
+        "total_duration": float(db_log.total_duration),
+        "category_id": db_log.category_id,
+        "task_id": db_log.task_id,
+        "meta": db_log.meta,
+        "stopped": db_log.stopped,
+        "name": db_log.name,
+        "description": db_log.description,
+        "id": db_log.id,
+    }
+
+
+def dump_log_line(db_log: Log) -> bytes:
+    # Line of the newline-delimited export
+    return orjson.dumps(dump_log(db_log)) + b"\n"
+
+
+def log_response(
+    db_log: Log,
+    headers: Optional[Mapping[str, str]] = None,
+) -> ORJSONResponse:
+    return ORJSONResponse(dump_log(db_log), headers=headers)
+
+
+def logs_response(
+    db_logs: Iterable[Log],
+    headers: Optional[Mapping[str, str]] = None,
+) -> ORJSONResponse:
+    return ORJSONResponse(
+        [dump_log(db_log) for db_log in db_logs],
+        headers=headers,
+    )
+
+
+def log_reads_response(
+    db_logs: Iterable[Log],
+    headers: Optional[Mapping[str, str]] = None,
+) -> ORJSONResponse:
+    return ORJSONResponse(
+        [dump_log_read(db_log) for db_log in db_logs],
+        headers=headers,
+    )
+
+
+def log_batch_response(
+    dynamic_log_ids: list[int],
+    db_logs: list[Optional[Log]],
+) -> ORJSONResponse:
+    # LogBatchItem payloads
+    return ORJSONResponse([
+        {
+            "id": dynamic_log_id,
+            "log": dump_log(db_log) if db_log is not None else None,
+        }
+        for dynamic_log_id, db_log in zip(dynamic_log_ids, db_logs)
+    ])
+
+
+def timeline_response(
+    rows: Sequence[tuple[int, int, datetime, Optional[datetime]]],
+    db_logs: Iterable[Log],
+    headers: Optional[Mapping[str, str]] = None,
+) -> ORJSONResponse:
+    # RecordTimeline payload from (id, log_id, start, end) rows
+    ids, log_ids, starts, ends = zip(*rows) if rows else ((), (), (), ())
+    return ORJSONResponse(
+        {
+            "ids": ids,
+            "log_ids": log_ids,
+            "starts": starts,
+            "ends": ends,
+            "logs": {
+                str(db_log.id): dump_log_read(db_log) for db_log in db_logs
+            },
+        },
+        headers=headers,
+    )
+
+
+# Alternative representations of log lists (content negotiation)
+#
+# The columnar layout stores every field as an array with one item per
+# log (record) instead of repeating the keys, tasks and categories are
+# stored once per response and referenced by their ids, flags by their
+# indexes in "flag_names". Records of the i-th log are the items
+# record_offsets[i]:record_offsets[i + 1] of the record columns.
+# MessagePack encodes the same columnar payload (datetimes are strings
+# in the same format as in JSON).
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.metasking.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+MEDIA_TYPE_FORMATS = {
+    JSON_MEDIA_TYPE: "json",
+    COLUMNAR_MEDIA_TYPE: "columnar",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+
+# OpenAPI description of the negotiated representations
+COLUMNAR_RESPONSE_CONTENT: dict[str, Any] = {
+    COLUMNAR_MEDIA_TYPE: {},
+    MSGPACK_MEDIA_TYPE: {},
+}
+
+
+def negotiate_format(request: Request) -> str:
+    """
+    Format of the response ("json", "columnar" or "msgpack") preferred
+    by the Accept header of the request, JSON unless asked otherwise
+    """
+
+    header = request.headers.get("accept")
+    if not header:
+        return "json"
+    best_format, best_quality = "json", 0.0
+    for media_range in header.split(","):
+        media_type, *params = media_range.split(";")
+        media_format = MEDIA_TYPE_FORMATS.get(media_type.strip().lower())
+        if media_format is None:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best_format, best_quality = media_format, quality
+    return best_format
+
+
+def format_etag(etag: str, response_format: str) -> str:
+    # Every representation has its own entity tag
+    if response_format == "json":
+        return etag
+    return f'{etag[:-1]}.{response_format}"'
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def columns_response(
+    payload: dict[str, Any],
+    response_format: str,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    if response_format == "msgpack":
+        return Response(
+            msgpack.packb(payload, default=_msgpack_default),
+            headers=headers,
+            media_type=MSGPACK_MEDIA_TYPE,
+        )
+    return ORJSONResponse(
+        payload,
+        headers=headers,
+        media_type=COLUMNAR_MEDIA_TYPE,
+    )
+
+
+def _named_columns(rows: Sequence[Any]) -> dict[str, list]:
+    # Task or category dictionary from (id, name, description) rows
+    return {
+        "ids": [row[0] for row in rows],
+        "names": [row[1] for row in rows],
+        "descriptions": [row[2] for row in rows],
+    }
+
+
+def log_columns(
+    db_logs: Sequence[Log],
+    details: Optional[LogDetailRows] = None,
+) -> dict[str, Any]:
+    """
+    Columnar payload of the logs, with their tasks, categories, flags
+    and records when the detail rows are given (see get_log_detail_rows)
+    """
+
+    payload: dict[str, Any] = {
+        "ids": [db_log.id for db_log in db_logs],
+        "starts": [db_log.start for db_log in db_logs],
+        "last_starts": [db_log.last_start for db_log in db_logs],
+        "ends": [db_log.end for db_log in db_logs],
+        "active": [db_log.active for db_log in db_logs],
+        "total_durations": [
+            float(db_log.total_duration) for db_log in db_logs
+        ],
+        "metas": [db_log.meta for db_log in db_logs],
+        "stopped": [db_log.stopped for db_log in db_logs],
+        "names": [db_log.name for db_log in db_logs],
+        "descriptions": [db_log.description for db_log in db_logs],
+        "task_ids": [db_log.task_id for db_log in db_logs],
+        "category_ids": [db_log.category_id for db_log in db_logs],
+    }
+    if details is None:
+        return payload
+
+    flag_indexes: dict[str, int] = {}
+    log_flags: dict[int, list[int]] = {}
+    for log_id, flag in details.flags:
+        log_flags.setdefault(log_id, []).append(
+            flag_indexes.setdefault(flag, len(flag_indexes))
+        )
+
+    log_records: dict[int, list[Any]] = {}
+    for row in details.records:
+        log_records.setdefault(row[0], []).append(row)
+    records: list[Any] = []
+    record_offsets = [0]
+    for db_log in db_logs:
+        records.extend(log_records.get(db_log.id, ()))
+        record_offsets.append(len(records))
+
+    payload.update({
+        "flags": [log_flags.get(db_log.id, []) for db_log in db_logs],
+        "record_offsets": record_offsets,
+        "records": {
+            "ids": [row[1] for row in records],
+            "metas": [row[2] for row in records],
+            "starts": [row[3] for row in records],
+            "ends": [row[4] for row in records],
+        },
+        "tasks": _named_columns(details.tasks),
+        "categories": _named_columns(details.categories),
+        "flag_names": list(flag_indexes),
+    })
+    return payload
+
+
+def timeline_columns(
+    rows: Sequence[tuple[int, int, datetime, Optional[datetime]]],
+    db_logs: Sequence[Log],
+) -> dict[str, Any]:
+    # Columnar RecordTimeline payload, logs are columns too
+    ids, log_ids, starts, ends = zip(*rows) if rows else ((), (), (), ())
+    return {
+        "ids": ids,
+        "log_ids": log_ids,
+        "starts": starts,
+        "ends": ends,
+        "logs": log_columns(db_logs),
+    }
@@ -1,8 +1,10 @@
 import os
-from typing import Annotated
+import json
+import base64
+from typing import Annotated, AsyncIterator, Optional
 from datetime import datetime, timedelta
 
-from fastapi import HTTPException, Query, Depends
+from fastapi import HTTPException, Query, Depends, Request, Response
 
 
 READ_ONLY = os.environ.get("READ_ONLY", "false").lower() in (
@@ -27,3 +29,68 @@ RequestTime = Annotated[
     datetime,
     Depends(use_request_time, use_cache=False)
 ]
+
+
+def encode_cursor(
+    order: str,
+    sort_key: Optional[datetime],
+    log_id: int,
+) -> str:
+    """
+    Opaque pagination cursor pointing right after the given log
+    """
+
+    data = {
+        "order": order,
+        "key": sort_key.isoformat() if sort_key else None,
+        "id": log_id,
+    }
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_cursor(cursor: str, order: str) -> tuple[Optional[datetime], int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        sort_key = data["key"]
+        if sort_key is not None:
+            sort_key = datetime.fromisoformat(sort_key)
+        log_id = int(data["id"])
+        cursor_order = data["order"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_order != order:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor was created for a different order"
+        )
+    return sort_key, log_id
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Split a byte stream (e.g. request body) into lines
+    """
+
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    304 response when the If-None-Match header of the request matches
+    the ETag (weak comparison), None otherwise
+    """
+
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -32,6 +32,26 @@ config.set_section_option(
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Full text search index is created by a migration with raw SQL
+    # (not part of the models), do not let autogenerate drop it
+    if type_ == "table" and name.startswith("log_fts"):
+        return False
+    if type_ in ("column", "index") and name in ("search", "ix_log_search"):
+        return False
+    # Same for the record interval index
+    if type_ == "table" and name.startswith("record_interval"):
+        return False
+    if type_ == "index" and name == "ix_record_interval":
+        return False
+    # Rebuilt in descending key order on PostgreSQL (SQLite indexes cannot
+    # declare NULLS LAST), the models keep the plain index for SQLite
+    if type_ == "index" and name == "ix_log_stopped_last_start_id":
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -56,6 +76,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -77,7 +98,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,63 @@
+"""add indexes for api queries
+
+Revision ID: 3f6a2c9d41b7
+Revises: e7b1be22f200
+Create Date: 2026-10-17 09:12:43.518207+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a2c9d41b7'
+down_revision: Union[str, None] = 'e7b1be22f200'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_log_stopped_id',
+        'log',
+        ['stopped', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_log_category_id',
+        'log',
+        ['category_id'],
+        unique=False,
+    )
+    op.create_index('ix_log_task_id', 'log', ['task_id'], unique=False)
+    op.create_index(
+        'ix_record_log_id_start',
+        'record',
+        ['log_id', 'start'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_record_open',
+        'record',
+        ['end', 'start'],
+        unique=False,
+        sqlite_where=sa.text('"end" IS NULL'),
+        postgresql_where=sa.text('"end" IS NULL'),
+    )
+    op.create_index(
+        'ix_logflag_flag_log_id',
+        'logflag',
+        ['flag', 'log_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_logflag_flag_log_id', table_name='logflag')
+    op.drop_index('ix_record_open', table_name='record')
+    op.drop_index('ix_record_log_id_start', table_name='record')
+    op.drop_index('ix_log_task_id', table_name='log')
+    op.drop_index('ix_log_category_id', table_name='log')
+    op.drop_index('ix_log_stopped_id', table_name='log')
@@ -0,0 +1,108 @@
+"""add log summary columns
+
+Revision ID: 9b04e1d7c2a8
+Revises: 3f6a2c9d41b7
+Create Date: 2026-10-17 11:05:21.774310+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b04e1d7c2a8'
+down_revision: Union[str, None] = '3f6a2c9d41b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DURATION = {
+    'sqlite': 'ROUND((julianday("end") - julianday(start)) * 86400.0, 3)',
+    'postgresql': 'EXTRACT(EPOCH FROM ("end" - start))',
+}
+
+BACKFILL = '''
+UPDATE log SET
+    start = (SELECT MIN(start) FROM record WHERE log_id = log.id),
+    last_start = (SELECT MAX(start) FROM record WHERE log_id = log.id),
+    "end" = CASE
+        WHEN EXISTS (
+            SELECT 1 FROM record
+            WHERE log_id = log.id AND "end" IS NULL
+        ) THEN NULL
+        ELSE (SELECT MAX("end") FROM record WHERE log_id = log.id)
+    END,
+    active = EXISTS (
+        SELECT 1 FROM record
+        WHERE log_id = log.id AND "end" IS NULL
+    ),
+    total_duration = COALESCE((
+        SELECT SUM({duration}) FROM record
+        WHERE log_id = log.id AND "end" IS NOT NULL
+    ), 0)
+'''
+
+
+def upgrade() -> None:
+    op.add_column('log', sa.Column('start', sa.DateTime(), nullable=True))
+    op.add_column(
+        'log',
+        sa.Column('last_start', sa.DateTime(), nullable=True),
+    )
+    op.add_column('log', sa.Column('end', sa.DateTime(), nullable=True))
+    op.add_column(
+        'log',
+        sa.Column(
+            'active',
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.false(),
+        ),
+    )
+    op.add_column(
+        'log',
+        sa.Column(
+            'total_duration',
+            sa.Float(),
+            nullable=False,
+            server_default='0',
+        ),
+    )
+
+    dialect = op.get_bind().dialect.name
+    op.execute(BACKFILL.format(duration=DURATION[dialect]))
+
+    op.drop_index('ix_log_stopped_id', table_name='log')
+    op.create_index(
+        'ix_log_stopped_last_start_id',
+        'log',
+        ['stopped', 'last_start', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_log_last_start_id',
+        'log',
+        ['last_start', 'id'],
+        unique=False,
+    )
+    op.create_index('ix_log_start_id', 'log', ['start', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_log_start_id', table_name='log')
+    op.drop_index('ix_log_last_start_id', table_name='log')
+    op.drop_index('ix_log_stopped_last_start_id', table_name='log')
+    op.create_index(
+        'ix_log_stopped_id',
+        'log',
+        ['stopped', 'id'],
+        unique=False,
+    )
+    with op.batch_alter_table('log') as batch_op:
+        batch_op.drop_column('total_duration')
+        batch_op.drop_column('active')
+        batch_op.drop_column('end')
+        batch_op.drop_column('last_start')
+        batch_op.drop_column('start')
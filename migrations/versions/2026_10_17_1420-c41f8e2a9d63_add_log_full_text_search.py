@@ -0,0 +1,98 @@
+"""add log full text search
+
+Revision ID: c41f8e2a9d63
+Revises: 9b04e1d7c2a8
+Create Date: 2026-10-17 14:20:08.391552+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f8e2a9d63'
+down_revision: Union[str, None] = '9b04e1d7c2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite: external content FTS5 table kept in sync by triggers
+SQLITE_UPGRADE = [
+    '''
+    CREATE VIRTUAL TABLE log_fts USING fts5(
+        name,
+        description,
+        content='log',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    ''',
+    "INSERT INTO log_fts(log_fts) VALUES ('rebuild')",
+    '''
+    CREATE TRIGGER log_fts_insert AFTER INSERT ON log BEGIN
+        INSERT INTO log_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    ''',
+    '''
+    CREATE TRIGGER log_fts_delete AFTER DELETE ON log BEGIN
+        INSERT INTO log_fts(log_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    ''',
+    # Summary updates do not touch the index
+    '''
+    CREATE TRIGGER log_fts_update AFTER UPDATE OF name, description ON log
+    BEGIN
+        INSERT INTO log_fts(log_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO log_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    ''',
+]
+
+SQLITE_DOWNGRADE = [
+    'DROP TRIGGER log_fts_update',
+    'DROP TRIGGER log_fts_delete',
+    'DROP TRIGGER log_fts_insert',
+    'DROP TABLE log_fts',
+]
+
+# PostgreSQL: generated tsvector column (name weighs more) with GIN index
+POSTGRESQL_UPGRADE = [
+    '''
+    ALTER TABLE log ADD COLUMN search tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    ''',
+    'CREATE INDEX ix_log_search ON log USING GIN (search)',
+]
+
+POSTGRESQL_DOWNGRADE = [
+    'DROP INDEX ix_log_search',
+    'ALTER TABLE log DROP COLUMN search',
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    statements = {
+        'sqlite': SQLITE_UPGRADE,
+        'postgresql': POSTGRESQL_UPGRADE,
+    }[dialect]
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    statements = {
+        'sqlite': SQLITE_DOWNGRADE,
+        'postgresql': POSTGRESQL_DOWNGRADE,
+    }[dialect]
+    for statement in statements:
+        op.execute(statement)
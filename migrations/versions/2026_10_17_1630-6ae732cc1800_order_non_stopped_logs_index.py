@@ -0,0 +1,53 @@
+"""order non stopped logs index
+
+Revision ID: 6ae732cc1800
+Revises: c41f8e2a9d63
+Create Date: 2026-10-17 16:30:12.704315+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6ae732cc1800'
+down_revision: Union[str, None] = 'c41f8e2a9d63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Non stopped logs are read most recent first (last_start DESC NULLS LAST,
+# id DESC). SQLite scans the ascending index backwards in this order
+# (NULL is the smallest value there), PostgreSQL sorts NULL as the largest
+# value and needs the order in the index to avoid sorting all non stopped
+# logs on every dynamic id lookup.
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_log_stopped_last_start_id', table_name='log')
+    op.create_index(
+        'ix_log_stopped_last_start_id',
+        'log',
+        [
+            'stopped',
+            sa.text('last_start DESC NULLS LAST'),
+            sa.text('id DESC'),
+        ],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_log_stopped_last_start_id', table_name='log')
+    op.create_index(
+        'ix_log_stopped_last_start_id',
+        'log',
+        ['stopped', 'last_start', 'id'],
+        unique=False,
+    )
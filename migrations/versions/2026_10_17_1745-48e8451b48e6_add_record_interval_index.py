@@ -0,0 +1,99 @@
+"""add record interval index
+
+Revision ID: 48e8451b48e6
+Revises: 6ae732cc1800
+Create Date: 2026-10-17 17:45:37.120954+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '48e8451b48e6'
+down_revision: Union[str, None] = '6ae732cc1800'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# B-tree indexes bound only one side of an interval overlap
+# (start < until AND end > since), these index both ends at once
+
+# SQLite: R*Tree of record intervals in whole minutes since the epoch
+# (start rounded down, end rounded up, running records end at the maximum)
+# kept in sync by triggers
+SQLITE_UPGRADE = [
+    'CREATE VIRTUAL TABLE record_interval USING rtree_i32(id, lo, hi)',
+    '''
+    INSERT INTO record_interval(id, lo, hi)
+    SELECT
+        id,
+        strftime('%s', start) / 60,
+        coalesce((strftime('%s', "end") + 59) / 60, 2147483647)
+    FROM record
+    ''',
+    '''
+    CREATE TRIGGER record_interval_insert AFTER INSERT ON record BEGIN
+        INSERT INTO record_interval(id, lo, hi) VALUES (
+            new.id,
+            strftime('%s', new.start) / 60,
+            coalesce((strftime('%s', new."end") + 59) / 60, 2147483647)
+        );
+    END
+    ''',
+    '''
+    CREATE TRIGGER record_interval_update AFTER UPDATE OF start, "end"
+    ON record BEGIN
+        UPDATE record_interval SET
+            lo = strftime('%s', new.start) / 60,
+            hi = coalesce((strftime('%s', new."end") + 59) / 60, 2147483647)
+        WHERE id = new.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER record_interval_delete AFTER DELETE ON record BEGIN
+        DELETE FROM record_interval WHERE id = old.id;
+    END
+    ''',
+]
+
+SQLITE_DOWNGRADE = [
+    'DROP TRIGGER record_interval_delete',
+    'DROP TRIGGER record_interval_update',
+    'DROP TRIGGER record_interval_insert',
+    'DROP TABLE record_interval',
+]
+
+# PostgreSQL: GiST index of the record ranges (running records are
+# unbounded), inclusive bounds keep zero-length records non-empty
+POSTGRESQL_UPGRADE = [
+    '''
+    CREATE INDEX ix_record_interval ON record
+    USING GIST (tsrange(start, "end", '[]'))
+    ''',
+]
+
+POSTGRESQL_DOWNGRADE = [
+    'DROP INDEX ix_record_interval',
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    statements = {
+        'sqlite': SQLITE_UPGRADE,
+        'postgresql': POSTGRESQL_UPGRADE,
+    }[dialect]
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    statements = {
+        'sqlite': SQLITE_DOWNGRADE,
+        'postgresql': POSTGRESQL_DOWNGRADE,
+    }[dialect]
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The application reads its configuration on import
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "metasking.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DATABASE_PATH
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import metasking  # noqa: E402
+from metasking.db import active_record_cache, name_caches  # noqa: E402
+
+ROOT = Path(__file__).parent.parent
+
+# Children first (triggers keep the search and interval indexes in sync)
+TABLES = ("logflag", "record", "log", "task", "category")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    command.upgrade(config, "head")
+    yield DATABASE_PATH
+
+
+@pytest.fixture
+def client(database):
+    # Empty tables and caches for every test
+    connection = sqlite3.connect(database)
+    with connection:
+        for table in TABLES:
+            connection.execute(f"DELETE FROM {table}")
+    connection.close()
+    active_record_cache.invalidate()
+    for cache in name_caches.values():
+        cache.invalidate()
+    return TestClient(metasking.app)
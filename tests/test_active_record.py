@@ -0,0 +1,32 @@
+from metasking.db import ActiveRecord, active_record_cache
+from metasking.db.active import Unknown
+
+from test_log_transitions import API, start_log, two_open_logs
+
+
+def test_active_log_after_pausing_the_cached_one(client):
+    imported_id, started_id = two_open_logs(client)
+
+    response = client.post(
+        f"{API}/active/pause",
+        params={"override-time": "2024-01-01T10:00:00"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] == started_id
+
+    # The imported log is still running
+    active = client.get(f"{API}/active")
+    assert active.status_code == 200
+    assert active.json()["id"] == imported_id
+
+
+def test_only_open_record_is_cached(client):
+    started = start_log(client, "started", "2024-01-01T09:00:00")
+    assert client.get(f"{API}/active").json()["id"] == started["id"]
+    assert isinstance(active_record_cache.state, ActiveRecord)
+    assert active_record_cache.state.log_id == started["id"]
+
+
+def test_one_of_more_open_records_is_not_cached(client):
+    two_open_logs(client)
+    assert isinstance(active_record_cache.state, Unknown)
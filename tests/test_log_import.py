@@ -0,0 +1,63 @@
+API = "/api/v1/log"
+
+
+def imported_log(i):
+    return {
+        "name": f"log {i}",
+        "meta": {"i": i},
+        "flags": [{"flag": f"flag {i}"}, {"flag": "shared"}],
+        "records": [
+            {
+                "start": f"2024-01-{i + 1:02}T{hour:02}:00:00",
+                "end": f"2024-01-{i + 1:02}T{hour:02}:30:00",
+            }
+            for hour in range(i % 3 + 1)
+        ],
+    }
+
+
+def test_import_keeps_records_and_flags_with_their_logs(client):
+    logs = [imported_log(i) for i in range(20)]
+    response = client.post(
+        f"{API}/import",
+        params={"chunk_size": 7},
+        json=logs,
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["logs"] == 20
+    assert result["records"] == sum(len(log["records"]) for log in logs)
+    log_ids = [
+        log_id for chunk in result["chunks"] for log_id in chunk["log_ids"]
+    ]
+    assert len(log_ids) == 20
+
+    for log, log_id in zip(logs, log_ids):
+        db_log = client.get(f"{API}/{log_id}").json()
+        assert db_log["name"] == log["name"]
+        assert db_log["meta"] == log["meta"]
+        assert [flag["flag"] for flag in db_log["flags"]] == \
+            sorted(flag["flag"] for flag in log["flags"])
+        assert [
+            (record["start"], record["end"]) for record in db_log["records"]
+        ] == [(record["start"], record["end"]) for record in log["records"]]
+        assert db_log["total_duration"] == 1800 * len(log["records"])
+
+
+def test_import_resolves_names(client):
+    response = client.post(
+        f"{API}/import",
+        params={"create-task": "true"},
+        json=[
+            {"name": "a", "task": "first", "records": []},
+            {"name": "b", "task": "second", "records": []},
+            {"name": "c", "task": "first", "records": []},
+        ],
+    )
+    assert response.status_code == 200, response.text
+    log_ids = response.json()["chunks"][0]["log_ids"]
+    tasks = [
+        client.get(f"{API}/{log_id}").json()["task"]["name"]
+        for log_id in log_ids
+    ]
+    assert tasks == ["first", "second", "first"]
@@ -0,0 +1,90 @@
+API = "/api/v1/log"
+
+
+def daily_log(i):
+    # One record on each of three days, the minute tells the log apart
+    return {
+        "name": f"log {i}",
+        "meta": {"i": i},
+        "stopped": True,
+        "flags": [{"flag": f"flag {i}"}],
+        "records": [
+            {
+                "start": f"2024-01-0{day}T10:{i:02}:00",
+                "end": f"2024-01-0{day}T11:{i:02}:00",
+            }
+            for day in (1, 2, 3)
+        ],
+    }
+
+
+def test_split_logs_by_day(client):
+    logs = [daily_log(i) for i in range(10)]
+    response = client.post(f"{API}/import", json=logs)
+    assert response.status_code == 200, response.text
+
+    response = client.post(
+        f"{API}/split",
+        params={
+            "since": "2024-01-01T00:00:00",
+            "until": "2024-01-04T00:00:00",
+            "by": "day",
+        },
+    )
+    assert response.status_code == 200, response.text
+    parts = response.json()
+    assert len(parts) == 30
+
+    parts_by_log: dict[int, list[dict]] = {}
+    for part in parts:
+        parts_by_log.setdefault(part["meta"]["i"], []).append(part)
+    assert sorted(parts_by_log) == list(range(10))
+    for i, log_parts in parts_by_log.items():
+        days = []
+        for part in log_parts:
+            assert part["name"] == f"log {i}"
+            assert [flag["flag"] for flag in part["flags"]] == [f"flag {i}"]
+            assert len(part["records"]) == 1
+            record = part["records"][0]
+            assert record["start"][14:16] == f"{i:02}"
+            assert part["start"] == record["start"]
+            assert part["end"] == record["end"]
+            assert part["total_duration"] == 3600
+            days.append(record["start"][:10])
+        assert sorted(days) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def test_split_skips_days_without_records(client):
+    response = client.post(f"{API}/import", json=[{
+        "name": "gap",
+        "stopped": True,
+        "records": [
+            {"start": "2024-01-01T10:00:00", "end": "2024-01-01T11:00:00"},
+            {"start": "2024-01-03T10:00:00", "end": "2024-01-03T11:00:00"},
+            {"start": "2024-01-05T10:00:00", "end": "2024-01-05T11:00:00"},
+        ],
+    }])
+    assert response.status_code == 200, response.text
+
+    response = client.post(
+        f"{API}/split",
+        params={
+            "since": "2024-01-01T00:00:00",
+            "until": "2024-01-06T00:00:00",
+            "by": "day",
+        },
+    )
+    assert response.status_code == 200, response.text
+    parts = response.json()
+    assert sorted(part["start"] for part in parts) == [
+        "2024-01-01T10:00:00",
+        "2024-01-03T10:00:00",
+        "2024-01-05T10:00:00",
+    ]
+    for part in parts:
+        assert len(part["records"]) == 1
+        assert part["start"] == part["records"][0]["start"]
+
+    logs = client.get(f"{API}/list").json()
+    assert len(logs) == 3
+    assert all(db_log["records"] for db_log in logs)
@@ -0,0 +1,94 @@
+API = "/api/v1/log"
+
+
+def start_log(client, name, time):
+    response = client.post(
+        f"{API}/start",
+        params={"override-time": time},
+        json={"name": name},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def import_open_log(client, name, start):
+    # Imported logs can have open records next to the running log
+    response = client.post(
+        f"{API}/import",
+        json=[{"name": name, "records": [{"start": start, "end": None}]}],
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["chunks"][0]["log_ids"][0]
+
+
+def two_open_logs(client):
+    """
+    Started log and an imported log with an open record that started
+    earlier, the started one is the active log (and is cached as such)
+    """
+
+    started = start_log(client, "started", "2024-01-01T09:00:00")
+    imported_id = import_open_log(client, "imported", "2024-01-01T08:00:00")
+    active = client.get(f"{API}/active")
+    assert active.status_code == 200
+    assert active.json()["id"] == started["id"]
+    return imported_id, started["id"]
+
+
+def assert_closed(client, log_id, end):
+    db_log = client.get(f"{API}/{log_id}").json()
+    assert db_log["active"] is False
+    assert [record["end"] for record in db_log["records"]] == [end]
+    return db_log
+
+
+def test_pause_log_that_is_not_the_active_one(client):
+    imported_id, started_id = two_open_logs(client)
+
+    response = client.post(
+        f"{API}/{imported_id}/pause",
+        params={"override-time": "2024-01-01T10:00:00"},
+    )
+    assert response.status_code == 200, response.text
+    assert_closed(client, imported_id, "2024-01-01T10:00:00")
+    assert client.get(f"{API}/{started_id}").json()["active"] is True
+
+
+def test_stop_log_that_is_not_the_active_one(client):
+    imported_id, started_id = two_open_logs(client)
+
+    response = client.post(
+        f"{API}/{imported_id}/stop",
+        params={"override-time": "2024-01-01T10:00:00"},
+    )
+    assert response.status_code == 200, response.text
+    db_log = assert_closed(client, imported_id, "2024-01-01T10:00:00")
+    assert db_log["stopped"] is True
+    assert client.get(f"{API}/{started_id}").json()["active"] is True
+
+
+def test_stop_all_logs_closes_every_open_record(client):
+    imported_id, started_id = two_open_logs(client)
+
+    response = client.post(
+        f"{API}/all/stop",
+        params={"override-time": "2024-01-01T10:00:00"},
+    )
+    assert response.status_code == 200, response.text
+    assert sorted(db_log["id"] for db_log in response.json()) == \
+        sorted([imported_id, started_id])
+    for log_id in (imported_id, started_id):
+        db_log = assert_closed(client, log_id, "2024-01-01T10:00:00")
+        assert db_log["stopped"] is True
+    assert client.get(f"{API}/active").status_code == 404
+
+
+def test_start_pauses_every_open_record(client):
+    imported_id, started_id = two_open_logs(client)
+
+    new = start_log(client, "new", "2024-01-01T10:00:00")
+    for log_id in (imported_id, started_id):
+        assert_closed(client, log_id, "2024-01-01T10:00:00")
+    active = client.get(f"{API}/active")
+    assert active.status_code == 200
+    assert active.json()["id"] == new["id"]
@@ -0,0 +1,75 @@
+from metasking.db import name_caches
+from metasking.model import Task, Category
+
+API = "/api/v1"
+
+
+def create_task(client, name):
+    response = client.post(f"{API}/task/", json={"name": name})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def logs_of_task(client, name):
+    response = client.get(f"{API}/log/list", params={"task": name})
+    assert response.status_code == 200, response.text
+    return [db_log["id"] for db_log in response.json()]
+
+
+def test_name_lookup_is_cached(client):
+    task_id = create_task(client, "cached")
+    assert logs_of_task(client, "cached") == []
+    assert name_caches[Task].get_id("cached") == task_id
+    assert name_caches[Task].get_name(task_id) == "cached"
+
+
+def test_log_writes_keep_the_cache(client):
+    task_id = create_task(client, "kept")
+    logs_of_task(client, "kept")
+
+    response = client.post(f"{API}/log/import", json=[{
+        "name": "imported",
+        "task": "kept",
+        "flags": [{"flag": "a"}],
+        "records": [
+            {"start": "2024-01-01T10:00:00", "end": "2024-01-01T11:00:00"},
+        ],
+    }])
+    assert response.status_code == 200, response.text
+    assert name_caches[Task].get_id("kept") == task_id
+
+
+def test_task_changes_invalidate_the_cache(client):
+    task_id = create_task(client, "old")
+    logs_of_task(client, "old")
+
+    response = client.put(f"{API}/task/{task_id}", json={"name": "new"})
+    assert response.status_code == 200, response.text
+    assert name_caches[Task].get_id("old") is None
+    assert logs_of_task(client, "old") == []
+    assert name_caches[Task].get_id("new") is None
+
+    response = client.delete(f"{API}/task/{task_id}")
+    assert response.status_code == 200, response.text
+    response = client.get(f"{API}/log/list", params={"task_id": task_id})
+    assert response.status_code == 404
+
+
+def test_implicit_creation_invalidates_the_cache(client):
+    category_id = client.post(
+        f"{API}/category/",
+        json={"name": "known"},
+    ).json()["id"]
+    response = client.get(f"{API}/log/list", params={"category": "known"})
+    assert response.status_code == 200
+    assert name_caches[Category].get_id("known") == category_id
+
+    response = client.post(
+        f"{API}/log/import",
+        params={"create-category": "true"},
+        json=[{"name": "imported", "category": "created", "records": []}],
+    )
+    assert response.status_code == 200, response.text
+    assert name_caches[Category].get_id("known") is None
+    response = client.get(f"{API}/log/list", params={"category": "created"})
+    assert len(response.json()) == 1
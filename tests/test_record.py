@@ -0,0 +1,60 @@
+API = "/api/v1"
+
+
+def create_log(client):
+    response = client.post(f"{API}/log/", json={
+        "name": "log",
+        "records": [
+            {"start": "2024-01-01T10:00:00", "end": "2024-01-01T11:00:00"},
+        ],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_create_record_of_unknown_log(client):
+    response = client.post(f"{API}/record/", json={
+        "log_id": 999999,
+        "start": "2024-01-01T10:00:00",
+    })
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Log not found"
+
+
+def test_move_record_to_unknown_log(client):
+    db_log = create_log(client)
+    record_id = db_log["records"][0]["id"]
+
+    response = client.put(
+        f"{API}/record/{record_id}",
+        json={"log_id": 999999},
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Log not found"
+    response = client.get(f"{API}/record/{record_id}")
+    assert response.json()["log_id"] == db_log["id"]
+
+
+def test_move_record_to_another_log(client):
+    db_log = create_log(client)
+    other_log = create_log(client)
+    record_id = db_log["records"][0]["id"]
+
+    response = client.put(
+        f"{API}/record/{record_id}",
+        json={"log_id": other_log["id"]},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["log_id"] == other_log["id"]
+    assert len(client.get(f"{API}/log/{other_log['id']}").json()["records"]) \
+        == 2
+
+
+def test_create_log_with_unknown_task(client):
+    response = client.post(f"{API}/log/", json={
+        "name": "log",
+        "task_id": 999999,
+        "records": [],
+    })
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Task not found: 999999"
@@ -0,0 +1,24 @@
+def test_timeline_returns_zero_length_records(client):
+    response = client.post("/api/v1/log/import", json=[{
+        "name": "instant",
+        "records": [
+            {"start": "2024-01-01T10:00:00", "end": "2024-01-01T10:00:00"},
+            {"start": "2024-01-01T11:00:00", "end": "2024-01-01T12:00:00"},
+            {"start": "2024-01-03T10:00:00", "end": "2024-01-03T10:00:00"},
+        ],
+    }])
+    assert response.status_code == 200, response.text
+    log_id = response.json()["chunks"][0]["log_ids"][0]
+
+    response = client.get(
+        "/api/v1/record/timeline",
+        params={
+            "since": "2024-01-01T00:00:00",
+            "until": "2024-01-02T00:00:00",
+        },
+    )
+    assert response.status_code == 200, response.text
+    timeline = response.json()
+    assert timeline["starts"] == ["2024-01-01T10:00:00", "2024-01-01T11:00:00"]
+    assert timeline["ends"] == ["2024-01-01T10:00:00", "2024-01-01T12:00:00"]
+    assert timeline["log_ids"] == [log_id, log_id]
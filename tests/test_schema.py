@@ -0,0 +1,14 @@
+from sqlalchemy import create_engine, inspect
+from sqlmodel import SQLModel
+
+
+def test_create_all_on_sqlite():
+    # Fresh databases and tooling create the schema from the models
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    indexes = {
+        index["name"]: index["column_names"]
+        for index in inspect(engine).get_indexes("log")
+    }
+    assert indexes["ix_log_stopped_last_start_id"] == \
+        ["stopped", "last_start", "id"]